@@ -0,0 +1,152 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.apps import apps
+from django.db import transaction
+
+from .cache import table_versions
+from .search import normalize
+
+# Entidades con autocompletado: nombre del modelo -> modelo
+ENTITIES = {
+    "client": "app.Client",
+    "provider": "app.Provider",
+    "veterinary": "app.Veterinary",
+    "medicine": "app.Medicine",
+}
+
+# Resultados por consulta
+AUTOCOMPLETE_LIMIT = 10
+
+# Segundos tras los que el índice se recarga completo aunque no haya cambios
+# visibles, por si se perdió algún cambio hecho en otro proceso
+MAX_INDEX_AGE = 300
+
+
+def name_keys(name):
+    """
+    Devuelve las claves de un nombre: el nombre completo y cada sufijo que empieza en una palabra.
+
+    Así "Luna Pérez" se encuentra escribiendo "lu" o "pe".
+    """
+    words = normalize(name).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Índice en memoria de los nombres de una tabla, ordenado para buscar por prefijo.
+
+    Las claves son tuplas (nombre normalizado, id) en una lista ordenada: una
+    búsqueda es un bisect más la lectura de los siguientes elementos, sin
+    consultar la base de datos. Se carga la primera vez que se usa, se
+    actualiza fila por fila con las escrituras de este proceso y se recarga
+    entera cuando cambia la versión de la tabla (escrituras de otro proceso).
+    """
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded_at = 0
+        self.keys = []
+        self.rows = {}
+
+    def load(self):
+        """
+        Lee todos los nombres de la tabla y arma el índice.
+        """
+        version = table_versions(self.model)[0]
+        rows = {pk: (name, name_keys(name)) for pk, name in self.model.objects.values_list("id", "name")}
+        keys = sorted((key, pk) for pk, (_, row_keys) in rows.items() for key in row_keys)
+        with self.lock:
+            self.rows, self.keys = rows, keys
+            self.version, self.loaded_at = version, time.monotonic()
+
+    def ensure_current(self):
+        """
+        Recarga el índice si nunca se cargó, si la tabla cambió en otro proceso o si es muy viejo.
+        """
+        stale = time.monotonic() - self.loaded_at > MAX_INDEX_AGE
+        if stale or self.version != table_versions(self.model)[0]:
+            self.load()
+
+    def apply(self, pk, name, version):
+        """
+        Actualiza una fila del índice (name=None si se eliminó) y adopta la versión de la tabla.
+        """
+        with self.lock:
+            if self.version is None:
+                return
+            _, old_keys = self.rows.pop(pk, (None, []))
+            for key in old_keys:
+                position = bisect_left(self.keys, (key, pk))
+                if position < len(self.keys) and self.keys[position] == (key, pk):
+                    del self.keys[position]
+            if name is not None:
+                row_keys = name_keys(name)
+                self.rows[pk] = (name, row_keys)
+                for key in row_keys:
+                    insort(self.keys, (key, pk))
+            self.version = version
+
+    def lookup(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Devuelve hasta `limit` filas cuyo nombre (o alguna de sus palabras) empieza con `prefix`.
+
+        Returns:
+            list: Diccionarios {"id", "name"} ordenados por nombre.
+        """
+        prefix = normalize(prefix).strip()
+        if not prefix:
+            return []
+        self.ensure_current()
+        results = []
+        seen = set()
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, pk = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append({"id": pk, "name": self.rows[pk][0]})
+                position += 1
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(entity):
+    """
+    Devuelve el índice del proceso para una entidad, creándolo la primera vez.
+
+    Raises:
+        KeyError: Si la entidad no tiene autocompletado.
+    """
+    with _indexes_lock:
+        if entity not in _indexes:
+            _indexes[entity] = PrefixIndex(apps.get_model(ENTITIES[entity]))
+        return _indexes[entity]
+
+
+def record_change(model, pk, name):
+    """
+    Aplica una escritura al índice del proceso cuando se confirma la transacción.
+
+    Se registra después del cambio de versión de VersionedModel, así que al
+    confirmar el índice adopta la versión que dejó esta misma escritura y no
+    necesita recargarse.
+
+    Args:
+        model (type): Modelo de la fila escrita.
+        pk (int): Id de la fila.
+        name (str): Nombre nuevo, o None si la fila se eliminó.
+    """
+    index = _indexes.get(model._meta.model_name)
+    if index is None or index.model is not model:
+        return
+    transaction.on_commit(lambda: index.apply(pk, name, table_versions(model)[0]))
@@ -0,0 +1,142 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from .templatetags import filters
+
+
+def version_cache():
+    """
+    Devuelve la caché de versiones de tablas, separada de la de páginas para que nunca se desalojen juntas.
+    """
+    return caches["table_versions"]
+
+
+def version_key(model):
+    """
+    Devuelve la clave de caché que guarda la versión de la tabla de un modelo.
+    """
+    return f"vetsoft:version:{model._meta.label_lower}"
+
+
+def table_versions(*models):
+    """
+    Devuelve la versión actual de la tabla de cada modelo.
+
+    La versión es una marca de tiempo en nanosegundos. Si la clave no está en
+    la caché (nunca se escribió o fue desalojada) se inicializa con la hora
+    actual, que siempre es mayor que cualquier versión usada antes; así una
+    clave perdida nunca vuelve a servir una página vieja.
+    """
+    store = version_cache()
+    keys = [version_key(model) for model in models]
+    versions = store.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            store.add(key, time.time_ns(), timeout=None)
+            versions[key] = store.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_table_version(model):
+    """
+    Marca la tabla de un modelo como modificada, invalidando sus páginas en caché.
+    """
+    store = version_cache()
+    key = version_key(model)
+    current = store.get(key) or 0
+    store.set(key, max(time.time_ns(), current + 1), timeout=None)
+
+
+def page_cache_key(request, models, csrf_cookie):
+    """
+    Arma la clave de una página: ruta, parámetros, versiones de tablas y cookie CSRF.
+    """
+    parts = [request.path, sorted(request.GET.lists()), table_versions(*models), csrf_cookie]
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+    return f"vetsoft:page:{digest}"
+
+
+def cache_page_by_version(*models, timeout=DEFAULT_TIMEOUT):
+    """
+    Cachea la respuesta GET de una vista mientras no cambien las tablas de `models`.
+
+    Las páginas llevan tokens CSRF en sus formularios, así que la clave incluye
+    la cookie CSRF del navegador (como el Vary: Cookie de la caché de Django) y
+    no se cachea nada para quien todavía no tiene la cookie.
+
+    Args:
+        models: Modelos cuyas tablas se muestran en la página.
+        timeout (int): Segundos de vida de la entrada; por defecto, el de la caché.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+            if request.method != "GET" or request.GET.get("stream") or not csrf_cookie:
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, models, csrf_cookie)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_by_version(*models, signed_urls=False):
+    """
+    Responde 304 a los GET condicionales mientras no cambien las tablas de `models`.
+
+    Los validadores salen solo de las versiones de las tablas (sin consultar
+    la base de datos), así que el 304 se decide antes de ejecutar la vista.
+    El ETag cubre además la ruta, los parámetros y la cookie CSRF (la página
+    guardada por el navegador lleva su token). Last-Modified es la versión más
+    nueva; como HTTP lo expresa en segundos, se omite mientras esa versión
+    tenga menos de un segundo, para que dos escrituras en el mismo segundo no
+    compartan fecha.
+
+    Las páginas con URLs de imágenes firmadas (tokens SAS que vencen) suman el
+    intervalo de firma actual a los validadores: al empezar otro intervalo ya
+    no se responde 304 y el navegador recibe URLs con tokens vigentes.
+
+    Args:
+        models: Modelos cuyas tablas se muestran en la página.
+        signed_urls (bool): Si la página muestra URLs de imágenes con token SAS.
+    """
+    def sas_version():
+        if not signed_urls:
+            return None
+        return int(filters.sas_bucket(datetime.now(timezone.utc)).timestamp()) * 1_000_000_000
+
+    def etag(request, *args, **kwargs):
+        parts = [
+            request.path,
+            sorted(request.GET.lists()),
+            table_versions(*models),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            sas_version(),
+        ]
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+    def last_modified(request, *args, **kwargs):
+        newest = max(table_versions(*models))
+        newest = max(newest, sas_version() or 0)
+        if time.time_ns() - newest < 1_000_000_000:
+            return None
+        return datetime.fromtimestamp(newest // 1_000_000_000, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
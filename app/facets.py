@@ -0,0 +1,180 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.db.models.functions import Cast
+
+from .cache import table_versions
+from .models import Product, Provider
+from .search import normalize
+
+# Rangos de precio de la faceta: (clave, etiqueta, desde, hasta sin incluir)
+PRICE_BUCKETS = (
+    ("0-1000", "Hasta $1000", None, 1000),
+    ("1000-5000", "$1000 a $5000", 1000, 5000),
+    ("5000-20000", "$5000 a $20000", 5000, 20000),
+    ("20000-", "Más de $20000", 20000, None),
+)
+
+# Cantidad máxima de etiquetas que se muestran en la faceta
+TAG_FACET_LIMIT = 30
+
+# Parámetros GET de las facetas y su título
+FACETS = (("provider", "Proveedor"), ("price", "Precio"), ("tag", "Etiqueta"))
+
+
+def price_condition(lower, upper):
+    """
+    Devuelve la condición de un rango de precio; el límite superior no se incluye.
+    """
+    condition = Q()
+    if lower is not None:
+        condition &= Q(price__gte=lower)
+    if upper is not None:
+        condition &= Q(price__lt=upper)
+    return condition
+
+
+def selected_facets(request):
+    """
+    Lee los filtros por faceta de la solicitud, descartando los valores inválidos.
+
+    Returns:
+        dict: {parámetro: clave elegida}, por ejemplo {"price": "0-1000"}.
+    """
+    selected = {}
+    provider = request.GET.get("provider", "")
+    if provider.isdigit():
+        selected["provider"] = provider
+    price = request.GET.get("price", "")
+    if price in {key for key, *_ in PRICE_BUCKETS}:
+        selected["price"] = price
+    tag = request.GET.get("tag", "").strip()
+    if tag:
+        selected["tag"] = tag
+    return selected
+
+
+def filter_facets(products, selected):
+    """
+    Filtra los productos por las facetas elegidas; cada filtro usa un índice.
+    """
+    if "provider" in selected:
+        products = products.filter(provider_id=int(selected["provider"]))
+    if "price" in selected:
+        _, _, lower, upper = next(bucket for bucket in PRICE_BUCKETS if bucket[0] == selected["price"])
+        products = products.filter(price_condition(lower, upper))
+    if "tag" in selected:
+        products = products.filter(tags__name=selected["tag"])
+    return products
+
+
+def count_query(products):
+    """
+    Arma la consulta de conteos de todas las facetas sobre los productos dados.
+
+    Es una única sentencia: un GROUP BY por faceta unidos con UNION ALL, con
+    filas (faceta, clave, etiqueta, cantidad).
+    """
+    products = products.order_by()
+
+    def grouped(queryset, facet, key, label, total):
+        return (
+            queryset.annotate(facet=Value(facet), key=Cast(key, CharField()), label=label)
+            .values("facet", "key", "label")
+            .annotate(total=total)
+            .values_list("facet", "key", "label", "total")
+        )
+
+    bucket = Case(
+        *[When(price_condition(lower, upper), then=Value(key)) for key, _, lower, upper in PRICE_BUCKETS],
+        output_field=CharField(),
+    )
+    by_provider = grouped(
+        products.filter(provider__isnull=False), "provider", F("provider_id"), F("provider__name"), Count("pk"),
+    )
+    # La etiqueta del rango sale de PRICE_BUCKETS
+    by_price = grouped(products, "price", bucket, Value(""), Count("pk"))
+    by_tag = grouped(
+        products.filter(tags__isnull=False), "tag", F("tags__name"), F("tags__name"), Count("pk", distinct=True),
+    )
+    return by_provider.union(by_price, by_tag, all=True)
+
+
+def facet_counts(products, query, selected):
+    """
+    Devuelve las filas de conteo de las facetas, cacheadas por versión de las tablas.
+
+    La clave lleva la búsqueda normalizada, los filtros elegidos y las
+    versiones de productos y proveedores, así que la comparten todos los
+    usuarios, órdenes y páginas de un mismo resultado, y cualquier escritura
+    la invalida.
+
+    Returns:
+        list: Tuplas (faceta, clave, etiqueta, cantidad).
+    """
+    parts = [normalize((query or "").strip()), sorted(selected.items()), table_versions(Product, Provider)]
+    key = f"vetsoft:facets:{hashlib.sha256(repr(parts).encode()).hexdigest()}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(count_query(products))
+        cache.set(key, rows)
+    return rows
+
+
+def facet_groups(request, rows, selected):
+    """
+    Arma las facetas para el template, con el enlace que activa o quita cada valor.
+
+    Returns:
+        list: Un dict por faceta con "title" y "values" (label, count, active, query).
+    """
+    counts = {facet: {} for facet, _ in FACETS}
+    for facet, key, label, total in rows:
+        counts[facet][key] = (label, total)
+
+    price_labels = {key: label for key, label, *_ in PRICE_BUCKETS}
+    order = {
+        "provider": sorted(counts["provider"].items(), key=lambda item: (-item[1][1], item[1][0])),
+        "price": [(key, counts["price"][key]) for key in price_labels if key in counts["price"]],
+        "tag": sorted(counts["tag"].items(), key=lambda item: (-item[1][1], item[0]))[:TAG_FACET_LIMIT],
+    }
+
+    groups = []
+    for facet, title in FACETS:
+        values = []
+        for key, (label, total) in order[facet]:
+            active = selected.get(facet) == key
+            params = request.GET.copy()
+            for name in ("cursor", "fragment", "stream"):
+                params.pop(name, None)
+            if active:
+                params.pop(facet, None)
+            else:
+                params[facet] = key
+            label = price_labels[key] if facet == "price" else label
+            values.append({"label": label, "count": total, "active": active, "query": params.urlencode()})
+        groups.append({"title": title, "values": values})
+    return groups
+
+
+def apply_facets(request, products, query=None):
+    """
+    Filtra los productos por las facetas de la solicitud y arma su contexto.
+
+    Los conteos no se calculan para ?fragment=rows ni ?stream=1, que no los muestran.
+
+    Args:
+        request (HttpRequest): Solicitud con los parámetros "provider", "price" y "tag".
+        products (QuerySet): Productos ya filtrados por la búsqueda.
+        query (str): Texto buscado, parte de la clave de la caché de conteos.
+
+    Returns:
+        tuple: (queryset filtrado, contexto con "selected_facets" y "facets").
+    """
+    selected = selected_facets(request)
+    products = filter_facets(products, selected)
+    context = {"selected_facets": selected}
+    if request.GET.get("fragment") != "rows" and not request.GET.get("stream"):
+        context["facets"] = facet_groups(request, facet_counts(products, query, selected), selected)
+    return products, context
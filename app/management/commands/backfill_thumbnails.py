@@ -0,0 +1,68 @@
+import logging
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from app.models import Medicine, Product, blob_container_client, upload_thumbnails
+from app.thumbnails import THUMBNAIL_SIZES
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas imágenes se informa el avance
+PROGRESS_EVERY = 100
+
+
+class Command(BaseCommand):
+    """
+    Genera las miniaturas de las imágenes de productos y medicamentos que no las tienen.
+    """
+    help = "Descarga las imágenes sin miniaturas, genera las miniaturas WebP y las sube junto a la original"
+
+    def add_arguments(self, parser):
+        """
+        Agrega las opciones --limit (máximo de imágenes por modelo) y --from-id (id desde el que seguir).
+        """
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument("--from-id", type=int, default=0)
+
+    def handle(self, *args, **options):
+        """
+        Procesa cada modelo e informa cuántas imágenes se completaron y cuántas fallaron.
+
+        Cada imagen se guarda apenas se procesa, así que un nuevo llamado sigue
+        con las que faltan. Una imagen que no se puede descargar, leer o subir
+        se registra y se saltea; con --from-id se pueden dejar atrás las que
+        fallan siempre.
+        """
+        container_client = blob_container_client()
+
+        for model in (Product, Medicine):
+            label = model._meta.model_name
+            pending = (
+                model.objects.filter(image_url__isnull=False, thumbnail_small="", id__gt=options["from_id"])
+                .exclude(image_url="")
+            )
+            done = failed = 0
+            last_id = None
+            for instance in pending.order_by("id")[: options["limit"]].iterator():
+                last_id = instance.id
+                try:
+                    name = instance.image_url.split("/")[-1]
+                    data = container_client.get_blob_client(name).download_blob().readall()
+                    thumbnails = upload_thumbnails(container_client, name, BytesIO(data))
+                    if not thumbnails:
+                        raise ValueError("no es una imagen válida")
+
+                    for field, thumbnail in thumbnails.items():
+                        setattr(instance, field, thumbnail)
+                    # updated_at cambia la versión de la fila y renueva su fragmento cacheado
+                    instance.save(update_fields=[*THUMBNAIL_SIZES, "updated_at"])
+                    done += 1
+                except Exception:
+                    logger.exception("No se pudieron generar las miniaturas de %s %d", label, instance.id)
+                    failed += 1
+
+                if (done + failed) % PROGRESS_EVERY == 0:
+                    self.stdout.write(f"{label}: {done + failed} procesadas (hasta id {last_id})")
+
+            self.stdout.write(f"{label}: {done} completadas, {failed} con error, último id {last_id}")
@@ -0,0 +1,75 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import Client, Product, Provider
+from app.rows import ClientRow, ProductRow
+
+
+def measure(load):
+    """
+    Ejecuta `load` y mide tiempo, memoria retenida por el resultado y pico de memoria.
+
+    Returns:
+        tuple: (segundos, bytes retenidos, bytes pico)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    # El resultado sigue vivo aquí, así que "retenida" es lo que ocupan las filas
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained, peak
+
+
+class Command(BaseCommand):
+    """
+    Compara el costo de cargar listados como filas compactas o como instancias del modelo.
+    """
+    help = "Mide memoria y CPU de las filas compactas de los listados frente a instancias completas"
+
+    def add_arguments(self, parser):
+        """
+        Agrega la opción --rows con la cantidad de filas a generar.
+        """
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        """
+        Genera datos de prueba en una transacción que se revierte y compara ambas cargas.
+        """
+        count = options["rows"]
+
+        with transaction.atomic():
+            provider = Provider.objects.create(name="Proveedor", email="p@vetsoft.com", address="Calle 1")
+            Client.objects.bulk_create(
+                Client(name=f"Cliente {i}", phone=54221000000 + i, email=f"c{i}@vetsoft.com", city="La Plata")
+                for i in range(count)
+            )
+            Product.objects.bulk_create(
+                Product(name=f"Producto {i}", tag="a,b", price=10, description="x" * 500, provider=provider)
+                for i in range(count)
+            )
+
+            cases = [
+                ("clientes", lambda: list(Client.objects.all()), lambda: ClientRow.fetch(Client.objects.all())),
+                (
+                    "productos",
+                    lambda: list(Product.objects.select_related("provider")),
+                    lambda: ProductRow.fetch(Product.objects.all()),
+                ),
+            ]
+            for label, load_models, load_rows in cases:
+                model_time, model_retained, model_peak = measure(load_models)
+                row_time, row_retained, row_peak = measure(load_rows)
+                self.stdout.write(
+                    f"{label} ({count} filas): "
+                    f"modelo {model_time * 1000:.0f} ms, {model_retained / 1024:.0f} KiB retenidos, {model_peak / 1024:.0f} KiB pico | "
+                    f"filas {row_time * 1000:.0f} ms, {row_retained / 1024:.0f} KiB retenidos, {row_peak / 1024:.0f} KiB pico",
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,86 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from app.models import Client
+from app.search import contains_text
+
+
+def random_word(rng, length=10):
+    """
+    Devuelve una palabra aleatoria en minúsculas, para que los trigramas sean variados.
+    """
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def client_search(query):
+    """
+    Arma la búsqueda por subcadena de clientes sobre las columnas con índice de trigramas.
+    """
+    condition = contains_text("name", query) | contains_text("email", query) | contains_text("city", query)
+    return Client.objects.filter(condition).order_by("id").values_list("id", "name")[:26]
+
+
+class Command(BaseCommand):
+    """
+    Mide la latencia de la búsqueda por subcadena a medida que crece la tabla de clientes.
+    """
+    help = "Genera clientes en una transacción que se revierte y mide la búsqueda con cada tamaño"
+
+    def add_arguments(self, parser):
+        """
+        Agrega las opciones --sizes (tamaños de tabla) y --repeat (repeticiones por consulta).
+        """
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """
+        Carga la tabla por tramos y, en cada tamaño, mide la mediana de cada búsqueda.
+        """
+        rng = random.Random(0)
+        needle = random_word(rng)
+        # Una subcadena presente en pocas filas y otra que no aparece en ninguna
+        terms = [needle[2:7], "qqzzq"]
+
+        with transaction.atomic():
+            created = 0
+            for size in sorted(options["sizes"]):
+                Client.objects.bulk_create(
+                    (
+                        Client(
+                            name=needle if i == 0 else random_word(rng),
+                            phone=54221000000 + i,
+                            email=f"c{i}@vetsoft.com",
+                            city="La Plata",
+                        )
+                        for i in range(created, size)
+                    ),
+                    batch_size=10000,
+                )
+                created = size
+                if connection.vendor == "postgresql":
+                    with connection.cursor() as cursor:
+                        cursor.execute("ANALYZE app_client")
+
+                results = []
+                for term in terms:
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        start = time.perf_counter()
+                        list(client_search(term))
+                        timings.append(time.perf_counter() - start)
+                    results.append(f"'{term}' {statistics.median(timings) * 1000:.1f} ms")
+                self.stdout.write(f"{size} filas: " + ", ".join(results))
+
+            if connection.vendor == "postgresql":
+                plan = client_search(terms[0]).explain()
+                uses_index = "unaccent_idx" in plan
+                self.stdout.write(f"Plan con índice de trigramas: {'sí' if uses_index else 'no'}")
+                self.stdout.write(plan)
+
+            transaction.set_rollback(True)
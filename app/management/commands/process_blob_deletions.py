@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.models import PendingBlobDeletion, delete_pending_blobs
+
+
+class Command(BaseCommand):
+    """
+    Reintenta los borrados de blobs de Azure que quedaron pendientes.
+    """
+    help = "Borra por lotes de Azure Blob Storage las imágenes pendientes de PendingBlobDeletion"
+
+    def handle(self, *args, **options):
+        """
+        Procesa los borrados pendientes e informa cuántos se completaron y cuántos fallaron.
+        """
+        deleted, failed = delete_pending_blobs()
+        self.stdout.write(f"blobs borrados: {deleted}, con error: {failed}")
+        self.stdout.write(f"pendientes: {PendingBlobDeletion.objects.count()}")
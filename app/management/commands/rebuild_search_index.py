@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app.models import SearchDocument
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye la tabla de la búsqueda global desde todas las entidades.
+    """
+    help = "Reconstruye los documentos de la búsqueda global recorriendo las tablas por lotes"
+
+    def add_arguments(self, parser):
+        """
+        Agrega la opción --batch-size con la cantidad de filas por lote.
+        """
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """
+        Reconstruye los documentos e informa cuántos se generaron por entidad.
+        """
+        totals = SearchDocument.rebuild(options["batch_size"])
+        for entity, total in totals.items():
+            self.stdout.write(f"{entity}: {total}")
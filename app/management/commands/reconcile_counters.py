@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.models import EntityCounter, ImageReference
+
+
+class Command(BaseCommand):
+    """
+    Recalcula los contadores del tablero del inicio y las referencias a imágenes desde las tablas.
+    """
+    help = "Reconstruye la tabla de contadores (totales por entidad y clientes por ciudad) y las referencias a imágenes"
+
+    def handle(self, *args, **options):
+        """
+        Recalcula los contadores e informa los valores resultantes.
+        """
+        values = EntityCounter.rebuild()
+        for key, value in sorted(values.items()):
+            self.stdout.write(f"{key}: {value}")
+        self.stdout.write(f"imágenes referenciadas: {ImageReference.rebuild()}")
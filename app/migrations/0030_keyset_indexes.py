@@ -0,0 +1,73 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0029_rename_type_product_tag'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['name', 'id'], name='client_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['phone', 'id'], name='client_phone_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['city', 'id'], name='client_city_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['name', 'id'], name='medicine_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['dose', 'id'], name='medicine_dose_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['name', 'id'], name='pet_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['breed', 'id'], name='pet_breed_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['birthday', 'id'], name='pet_birthday_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['weight', 'id'], name='pet_weight_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['name', 'id'], name='provider_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=models.Index(fields=['address', 'id'], name='provider_address_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinary',
+            index=models.Index(fields=['name', 'id'], name='veterinary_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinary',
+            index=models.Index(fields=['phone', 'id'], name='veterinary_phone_id_idx'),
+        ),
+    ]
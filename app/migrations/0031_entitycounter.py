@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    EntityCounter = apps.get_model('app', 'EntityCounter')
+    Client = apps.get_model('app', 'Client')
+
+    values = {
+        model_name: apps.get_model('app', model_name).objects.count()
+        for model_name in ('client', 'provider', 'product', 'pet', 'veterinary', 'medicine')
+    }
+    for city, total in Client.objects.values_list('city').annotate(total=Count('id')).order_by():
+        values[f'client.city:{city}'] = total
+
+    EntityCounter.objects.bulk_create(EntityCounter(key=key, value=value) for key, value in values.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0030_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=60, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Trigger que recalcula el vector de búsqueda de cada fila al insertarla o al
+# cambiar sus columnas de texto. Los pesos ordenan el ranking: A > B > C.
+TRIGGERS = {
+    "app_product": """
+        setweight(to_tsvector('spanish', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.tag, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.description, '')), 'C')
+    """,
+    "app_medicine": """
+        setweight(to_tsvector('spanish', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.description, '')), 'C')
+    """,
+}
+
+
+def create_search_triggers(apps, schema_editor):
+    """
+    Crea los índices GIN y los triggers del vector de búsqueda (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, vector in TRIGGERS.items():
+        columns = "name, tag, description" if table == "app_product" else "name, description"
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(f"""
+            CREATE TRIGGER {table}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+        """)
+        # Completa el vector de las filas existentes
+        schema_editor.execute(f"UPDATE {table} SET name = name")
+        index = table.removeprefix("app_")
+        schema_editor.execute(f"CREATE INDEX {index}_search_vector_idx ON {table} USING gin (search_vector)")
+
+
+def drop_search_triggers(apps, schema_editor):
+    """
+    Elimina los triggers y los índices GIN del vector de búsqueda (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TRIGGERS:
+        index = table.removeprefix("app_")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}_search_vector_idx")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0032_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Los índices GIN solo existen en PostgreSQL: se registran en el estado
+        # de los modelos y se crean junto con los triggers.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='medicine',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='medicine_search_vector_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='product',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_triggers, drop_search_triggers),
+            ],
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:12
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Columnas buscadas con icontains: (modelo, columna)
+SEARCHED_COLUMNS = [
+    ("client", "name"),
+    ("client", "email"),
+    ("client", "city"),
+    ("provider", "name"),
+    ("provider", "email"),
+    ("provider", "address"),
+    ("pet", "name"),
+    ("pet", "breed"),
+    ("veterinary", "name"),
+    ("veterinary", "email"),
+]
+
+
+def trigram_index(model_name, field):
+    """
+    Índice GIN de trigramas sobre UPPER(columna), igual al de app.models.trigram_index.
+    """
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(field), name='gin_trgm_ops'),
+        name=f'{model_name}_{field}_trgm_idx',
+    )
+
+
+def add_trigram_indexes(apps, schema_editor):
+    """
+    Crea los índices de trigramas (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, field in SEARCHED_COLUMNS:
+        schema_editor.add_index(apps.get_model("app", model_name), trigram_index(model_name, field))
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    """
+    Elimina los índices de trigramas (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, field in SEARCHED_COLUMNS:
+        schema_editor.remove_index(apps.get_model("app", model_name), trigram_index(model_name, field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_search_vector'),
+    ]
+
+    operations = [
+        # La extensión solo se crea en PostgreSQL; en otras bases no hace nada
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=trigram_index(model_name, field))
+                for model_name, field in SEARCHED_COLUMNS
+            ],
+            database_operations=[
+                migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.db import migrations, models
+
+INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='searchdocument_vector_idx'),
+    django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='searchdocument_title_trgm_idx'),
+]
+
+
+def create_search_document_indexes(apps, schema_editor):
+    """
+    Crea el trigger del vector de búsqueda y los índices GIN (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("""
+        CREATE FUNCTION app_searchdocument_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('spanish', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('spanish', coalesce(NEW.detail, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER app_searchdocument_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, detail ON app_searchdocument
+        FOR EACH ROW EXECUTE FUNCTION app_searchdocument_search_vector_update()
+    """)
+    model = apps.get_model("app", "SearchDocument")
+    for index in INDEXES:
+        schema_editor.add_index(model, index)
+
+
+def drop_search_document_indexes(apps, schema_editor):
+    """
+    Elimina el trigger del vector de búsqueda y los índices GIN (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    model = apps.get_model("app", "SearchDocument")
+    for index in INDEXES:
+        schema_editor.remove_index(model, index)
+    schema_editor.execute("DROP TRIGGER IF EXISTS app_searchdocument_search_vector_trigger ON app_searchdocument")
+    schema_editor.execute("DROP FUNCTION IF EXISTS app_searchdocument_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0034_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('detail', models.CharField(blank=True, max_length=700)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('entity', 'object_id'), name='searchdocument_entity_object_uniq'),
+        ),
+        # Los índices GIN solo existen en PostgreSQL: se registran en el estado
+        # del modelo y se crean junto con el trigger.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='searchdocument', index=index) for index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_document_indexes, drop_search_document_indexes),
+            ],
+        ),
+    ]
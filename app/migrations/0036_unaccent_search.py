@@ -0,0 +1,142 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models
+
+# Columnas buscadas por subcadena: (modelo, columna, prefijo del índice)
+SEARCHED_COLUMNS = [
+    ("client", "name", "client"),
+    ("client", "email", "client"),
+    ("client", "city", "client"),
+    ("provider", "name", "provider"),
+    ("provider", "email", "provider"),
+    ("provider", "address", "provider"),
+    ("pet", "name", "pet"),
+    ("pet", "breed", "pet"),
+    ("veterinary", "name", "veterinary"),
+    ("veterinary", "email", "veterinary"),
+    ("searchdocument", "title", "searchdoc"),
+]
+
+# Vectores de búsqueda mantenidos por trigger: tabla -> (columna a tocar, expresión)
+SEARCH_VECTORS = {
+    "app_product": ("name", """
+        setweight(to_tsvector('{config}', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.tag, '')), 'B') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.description, '')), 'C')
+    """),
+    "app_medicine": ("name", """
+        setweight(to_tsvector('{config}', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.description, '')), 'C')
+    """),
+    "app_searchdocument": ("title", """
+        setweight(to_tsvector('{config}', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.detail, '')), 'B')
+    """),
+}
+
+
+def old_index(model_name, field, prefix):
+    """
+    Índice de trigramas sobre UPPER(columna), el de las migraciones 0034 y 0035.
+    """
+    name = 'searchdocument_title_trgm_idx' if model_name == 'searchdocument' else f'{model_name}_{field}_trgm_idx'
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(field), name='gin_trgm_ops'),
+        name=name,
+    )
+
+
+def new_index(model_name, field, prefix):
+    """
+    Índice de trigramas sobre immutable_unaccent(lower(columna)), igual al de app.models.trigram_index.
+    """
+    unaccented = models.Func(
+        django.db.models.functions.text.Lower(field), function='immutable_unaccent', output_field=models.TextField(),
+    )
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(unaccented, name='gin_trgm_ops'),
+        name=f'{prefix}_{field}_unaccent_idx',
+    )
+
+
+def update_search_vectors(schema_editor, config):
+    """
+    Reescribe las funciones de los triggers con otra configuración de texto y recalcula los vectores.
+    """
+    for table, (column, vector) in SEARCH_VECTORS.items():
+        schema_editor.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector.format(config=config)};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(f"UPDATE {table} SET {column} = {column}")
+
+
+def use_unaccent(apps, schema_editor):
+    """
+    Crea la función y la configuración de texto sin acentos y cambia los índices (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # unaccent no es IMMUTABLE (depende del diccionario); la función envoltorio
+    # fija el diccionario y permite usarla en índices
+    schema_editor.execute("""
+        CREATE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+    schema_editor.execute("CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish)")
+    schema_editor.execute("""
+        ALTER TEXT SEARCH CONFIGURATION spanish_unaccent
+        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem
+    """)
+    update_search_vectors(schema_editor, "spanish_unaccent")
+    for model_name, field, prefix in SEARCHED_COLUMNS:
+        model = apps.get_model("app", model_name)
+        schema_editor.remove_index(model, old_index(model_name, field, prefix))
+        schema_editor.add_index(model, new_index(model_name, field, prefix))
+
+
+def restore_accents(apps, schema_editor):
+    """
+    Vuelve a los índices sobre UPPER(columna) y a la configuración "spanish" (solo PostgreSQL).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, field, prefix in SEARCHED_COLUMNS:
+        model = apps.get_model("app", model_name)
+        schema_editor.remove_index(model, new_index(model_name, field, prefix))
+        schema_editor.add_index(model, old_index(model_name, field, prefix))
+    update_search_vectors(schema_editor, "spanish")
+    schema_editor.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS spanish_unaccent")
+    schema_editor.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0035_searchdocument'),
+    ]
+
+    operations = [
+        # La extensión solo se crea en PostgreSQL; en otras bases no hace nada
+        UnaccentExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name=model_name, name=old_index(model_name, field, prefix).name)
+                for model_name, field, prefix in SEARCHED_COLUMNS
+            ] + [
+                migrations.AddIndex(model_name=model_name, index=new_index(model_name, field, prefix))
+                for model_name, field, prefix in SEARCHED_COLUMNS
+            ],
+            database_operations=[
+                migrations.RunPython(use_unaccent, restore_accents),
+            ],
+        ),
+    ]
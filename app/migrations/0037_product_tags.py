@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+def fill_tags(apps, schema_editor):
+    Product = apps.get_model('app', 'Product')
+    Tag = apps.get_model('app', 'Tag')
+    ProductTag = Product.tags.through
+
+    # Etiquetas de cada producto, sin espacios, vacías ni repetidas
+    product_tags = []
+    for product_id, text in Product.objects.values_list('id', 'tag').iterator():
+        names = dict.fromkeys(name.strip() for name in (text or '').split(','))
+        product_tags.extend((product_id, name) for name in names if name)
+
+    names = {name for _, name in product_tags}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    ProductTag.objects.bulk_create(
+        [ProductTag(product_id=product_id, tag_id=tag_ids[name]) for product_id, name in product_tags],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0036_unaccent_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='products', to='app.tag'),
+        ),
+        migrations.RunPython(fill_tags, migrations.RunPython.noop),
+    ]
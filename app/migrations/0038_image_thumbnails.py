@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0037_product_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='thumbnail_large',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='thumbnail_small',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_large',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_small',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
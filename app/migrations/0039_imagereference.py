@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:07
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fill_references(apps, schema_editor):
+    ImageReference = apps.get_model('app', 'ImageReference')
+
+    counts = Counter()
+    for model_name in ('product', 'medicine'):
+        model = apps.get_model('app', model_name)
+        for image_url in model.objects.exclude(image_url=None).exclude(image_url='').values_list('image_url', flat=True):
+            counts[image_url.split('/')[-1]] += 1
+
+    ImageReference.objects.bulk_create(
+        [ImageReference(name=name, count=count) for name, count in counts.items()], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0038_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0039_imagereference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingBlobDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('reference', models.CharField(max_length=100)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.CharField(blank=True, default='', max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1,15 +1,46 @@
+import hashlib
+import logging
 import re  # Importa el módulo de expresiones regulares
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError, models
+from django import db
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Func
+from django.db.models.functions import Lower
 from django.conf import settings
-from azure.storage.blob import BlobServiceClient
+from django.utils import timezone
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import BlobServiceClient, ContentSettings
 from django.core.files.uploadedfile import UploadedFile
-import uuid
 import os
 from decouple import config
 
+from . import autocomplete
+from .cache import bump_table_version
+from .thumbnails import THUMBNAIL_SIZES, make_thumbnails, thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+# Máximo de blobs por solicitud batch de borrado de Azure
+BLOB_DELETE_BATCH_SIZE = 256
+
+# Margen por la diferencia de reloj con Azure: solo se borran los blobs no
+# modificados desde este tiempo antes de decidir borrarlos
+BLOB_DELETE_CLOCK_MARGIN = timedelta(minutes=1)
+
+# Hilo que borra los blobs de Azure después del commit, fuera de la solicitud
+blob_deletion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blob-delete")
+
+# Los blobs de imágenes se nombran por su contenido, así que nunca cambian: el
+# navegador puede cachearlos sin volver a validarlos
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Cargar variables de entorno desde .env
@@ -46,7 +77,432 @@ class CityEnum(models.TextChoices):
     ZARATE = 'Zárate',
 
 
-    
+def trigram_index(prefix, field):
+    """
+    Índice GIN de trigramas para las búsquedas por subcadena (solo PostgreSQL).
+
+    Las búsquedas comparan unaccent(lower(columna)) con el texto normalizado
+    (ver app.search), así que el índice se crea sobre esa misma expresión para
+    que el planificador pueda usarlo. Se arma con un Func simple (el mismo SQL
+    que app.search.ImmutableUnaccent) para que la migración 0036 no dependa
+    del código de la aplicación.
+
+    Args:
+        prefix (str): Prefijo del nombre del índice (el nombre del modelo).
+        field (str): Columna de texto buscada.
+    """
+    return GinIndex(
+        OpClass(
+            Func(Lower(field), function="immutable_unaccent", output_field=models.TextField()), name="gin_trgm_ops",
+        ),
+        name=f"{prefix}_{field}_unaccent_idx",
+    )
+
+
+class VersionedModel(models.Model):
+    """
+    Modelo base que invalida la caché de páginas de su tabla en cada escritura.
+
+    `updated_at` es la versión de cada fila: forma parte de la clave de la
+    caché de fragmentos de las filas de los listados.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def bump_version(self):
+        """
+        Cambia la versión de la tabla ahora y otra vez al confirmar la transacción.
+
+        La segunda marca evita que una lectura concurrente, que todavía ve los
+        datos anteriores al commit, deje cacheada una página vieja.
+        """
+        model = type(self)
+        bump_table_version(model)
+        transaction.on_commit(lambda: bump_table_version(model))
+
+    def search_text(self):
+        """
+        Devuelve (título, detalle) para la búsqueda global, o None si la fila no se indexa.
+        """
+        return None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Carga la fila y recuerda en qué contadores de EntityCounter está contada.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._counted_keys = instance.counter_keys()
+        return instance
+
+    def counter_keys(self):
+        """
+        Devuelve las claves de EntityCounter en las que cuenta la fila.
+        """
+        return [self._meta.model_name]
+
+    def save_related(self, update_fields):
+        """
+        Guarda los datos relacionados de la fila (por ejemplo, relaciones muchos a muchos).
+
+        Corre dentro de la transacción de save, antes de cambiar la versión, así
+        nadie cachea la nueva versión con los datos relacionados anteriores.
+
+        Args:
+            update_fields (list): Los update_fields de save, o None si se guardaron todos.
+        """
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda la fila y sus datos relacionados, actualiza sus contadores, su
+        documento de búsqueda y su entrada de autocompletado, y cambia la
+        versión de la tabla, todo en una transacción.
+
+        Los contadores se actualizan acá y en delete, así cuentan las filas
+        creadas por cualquier camino (save_*, objects.create, admin, shell).
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            keys = self.counter_keys()
+            counted = [] if adding else getattr(self, "_counted_keys", keys)
+            for key in counted:
+                if key not in keys:
+                    EntityCounter.bump(key, -1)
+            for key in keys:
+                if key not in counted:
+                    EntityCounter.bump(key)
+            self._counted_keys = keys
+            self.save_related(kwargs.get("update_fields"))
+            SearchDocument.index(self)
+            self.bump_version()
+            autocomplete.record_change(type(self), self.pk, getattr(self, "name", None))
+
+    def delete(self, *args, **kwargs):
+        """
+        Elimina la fila, su documento de búsqueda y su entrada de autocompletado,
+        descuenta sus contadores y cambia la versión de la tabla.
+        """
+        pk = self.pk
+        with transaction.atomic():
+            SearchDocument.remove(self)
+            result = super().delete(*args, **kwargs)
+            for key in getattr(self, "_counted_keys", self.counter_keys()):
+                EntityCounter.bump(key, -1)
+            self.bump_version()
+            autocomplete.record_change(type(self), pk, None)
+        return result
+
+
+class EntityCounter(models.Model):
+    """
+    Contador de filas por entidad (y de clientes por ciudad) para el tablero del inicio.
+
+    Se actualiza en la misma transacción que el save y el delete de cada fila
+    (VersionedModel), así el inicio lee todos los totales en una sola consulta
+    en lugar de un COUNT(*) por tabla.
+    """
+    key = models.CharField(max_length=60, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        """
+        Devuelve la representación de cadena del contador.
+        """
+        return f"{self.key}: {self.value}"
+
+    @staticmethod
+    def city_key(city):
+        """
+        Devuelve la clave del contador de clientes de una ciudad.
+        """
+        return f"client.city:{city}"
+
+    @classmethod
+    def bump(cls, key, delta=1):
+        """
+        Suma `delta` al contador `key`, creándolo si no existe.
+
+        Debe llamarse dentro de la transacción de la escritura que cuenta.
+        """
+        if cls.objects.filter(key=key).update(value=F("value") + delta):
+            return
+        cls.objects.get_or_create(key=key)
+        cls.objects.filter(key=key).update(value=F("value") + delta)
+
+    @classmethod
+    def read(cls, key):
+        """
+        Devuelve el valor de un contador, o 0 si no existe.
+        """
+        return cls.objects.filter(key=key).values_list("value", flat=True).first() or 0
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Devuelve todos los contadores como un diccionario {clave: valor}.
+        """
+        return dict(cls.objects.values_list("key", "value"))
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcula todos los contadores desde las tablas.
+
+        Returns:
+            dict: Los contadores recalculados.
+        """
+        counted = (Client, Provider, Product, Pet, Veterinary, Medicine)
+
+        with transaction.atomic():
+            # Bloquea los contadores para que las escrituras concurrentes esperen
+            list(cls.objects.select_for_update())
+
+            values = {model._meta.model_name: model.objects.count() for model in counted}
+            for city, total in Client.objects.values_list("city").annotate(total=Count("id")).order_by():
+                values[cls.city_key(city)] = total
+
+            cls.objects.exclude(key__in=values).delete()
+            for key, value in values.items():
+                cls.objects.update_or_create(key=key, defaults={"value": value})
+
+        return values
+
+
+class ImageReference(models.Model):
+    """
+    Cantidad de productos y medicamentos que usan cada blob de imagen.
+
+    Los blobs se nombran por el SHA-256 de su contenido, así que la misma
+    imagen subida para varias filas es un único blob; solo se borra cuando se
+    suelta su última referencia. La referencia se toma al subir la imagen
+    (antes de decidir si se reutiliza el blob) y se suelta en la misma
+    transacción que la fila que deja de usarla; el comando reconcile_counters
+    la reconstruye.
+
+    La fila sigue existiendo con 0 referencias mientras haya borrados
+    pendientes de sus blobs: delete_pending_blobs la bloquea mientras decide
+    qué borrar, y una subida de la misma imagen con borrados pendientes la
+    vuelve a subir en lugar de reutilizar el blob.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        """
+        Devuelve la representación de cadena de la referencia.
+        """
+        return f"{self.name}: {self.count}"
+
+    @staticmethod
+    def blob_name(image_url):
+        """
+        Devuelve el nombre del blob de una URL de imagen.
+        """
+        return image_url.split("/")[-1]
+
+    @classmethod
+    def acquire(cls, image_url):
+        """
+        Suma una referencia al blob de la imagen, creándola si no existe.
+
+        La fila se bloquea (select_for_update): si delete_pending_blobs está
+        decidiendo qué blobs de la imagen borrar, espera a que termine.
+        """
+        name = cls.blob_name(image_url)
+        with transaction.atomic():
+            if cls.objects.select_for_update().filter(name=name).exists():
+                cls.objects.filter(name=name).update(count=F("count") + 1)
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(name=name, count=1)
+            except IntegrityError:
+                # Otra solicitud creó la fila al mismo tiempo
+                cls.objects.filter(name=name).update(count=F("count") + 1)
+
+    @classmethod
+    def release(cls, image_url):
+        """
+        Resta una referencia al blob de la imagen.
+
+        La fila queda con 0 referencias hasta que delete_pending_blobs borre sus blobs.
+
+        Returns:
+            int: Referencias que quedan; 0 si era la última (o si no estaba registrada).
+        """
+        name = cls.blob_name(image_url)
+        cls.objects.filter(name=name, count__gt=0).update(count=F("count") - 1)
+        return cls.objects.filter(name=name).values_list("count", flat=True).first() or 0
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcula las referencias desde las URLs de productos y medicamentos.
+
+        Returns:
+            int: Cantidad de blobs referenciados.
+        """
+        counts = {}
+        for model in (Product, Medicine):
+            for image_url in model.objects.exclude(image_url=None).exclude(image_url="").values_list("image_url", flat=True):
+                name = cls.blob_name(image_url)
+                counts[name] = counts.get(name, 0) + 1
+
+        with transaction.atomic():
+            # Las filas sin referencias con borrados pendientes se conservan para delete_pending_blobs
+            pending = set(PendingBlobDeletion.objects.values_list("reference", flat=True))
+            cls.objects.all().delete()
+            rows = {**dict.fromkeys(pending, 0), **counts}
+            cls.objects.bulk_create([cls(name=name, count=count) for name, count in rows.items()], batch_size=1000)
+        return len(counts)
+
+
+class PendingBlobDeletion(models.Model):
+    """
+    Blob de Azure que hay que borrar: cola durable de delete_image_from_azure.
+
+    Las filas se crean en la transacción que suelta la última referencia a la
+    imagen y se borran cuando el blob se elimina de Azure; las que fallan se
+    reintentan con el comando process_blob_deletions.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    # Blob de la imagen original: si vuelve a referenciarse, no se borra
+    reference = models.CharField(max_length=100)
+    attempts = models.IntegerField(default=0)
+    last_error = models.CharField(max_length=500, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Devuelve la representación de cadena del borrado pendiente.
+        """
+        return self.name
+
+
+class SearchDocument(models.Model):
+    """
+    Documento de la búsqueda global: una fila por cliente, proveedor, producto,
+    mascota, veterinario o medicamento, con su texto desnormalizado.
+
+    VersionedModel lo mantiene al guardar y al eliminar; el comando
+    rebuild_search_index lo reconstruye desde las tablas. En PostgreSQL un
+    trigger mantiene search_vector (título > detalle).
+    """
+    # Etiqueta y nombre de la URL de cada tipo de entidad indexada
+    ENTITIES = {
+        "client": ("Cliente", "clients_edit"),
+        "provider": ("Proveedor", "provider_edit"),
+        "product": ("Producto", "product_edit"),
+        "pet": ("Mascota", "pet_history"),
+        "veterinary": ("Veterinario", "veterinary_edit"),
+        "medicine": ("Medicamento", "medicine_edit"),
+    }
+
+    entity = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=100)
+    detail = models.CharField(max_length=700, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["entity", "object_id"], name="searchdocument_entity_object_uniq"),
+        ]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="searchdocument_vector_idx"),
+            trigram_index("searchdoc", "title"),
+        ]
+
+    def __str__(self):
+        """
+        Devuelve la representación de cadena del documento.
+        """
+        return f"{self.entity}:{self.object_id} {self.title}"
+
+    @property
+    def label(self):
+        """
+        Devuelve el nombre del tipo de entidad para mostrar.
+        """
+        return self.ENTITIES[self.entity][0]
+
+    @property
+    def url(self):
+        """
+        Devuelve la URL de la fila indexada.
+        """
+        from django.urls import reverse
+
+        return reverse(self.ENTITIES[self.entity][1], kwargs={"id": self.object_id})
+
+    @classmethod
+    def build(cls, instance):
+        """
+        Arma (sin guardar) el documento de una fila, o None si su modelo no se indexa.
+        """
+        text = instance.search_text()
+        if text is None:
+            return None
+        title, detail = text
+        return cls(entity=instance._meta.model_name, object_id=instance.pk, title=title, detail=detail)
+
+    @classmethod
+    def store(cls, documents):
+        """
+        Inserta o actualiza documentos en una sola consulta (INSERT ... ON CONFLICT).
+        """
+        cls.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["entity", "object_id"],
+            update_fields=["title", "detail"],
+        )
+
+    @classmethod
+    def index(cls, instance):
+        """
+        Crea o actualiza el documento de una fila.
+        """
+        document = cls.build(instance)
+        if document is not None:
+            cls.store([document])
+
+    @classmethod
+    def remove(cls, instance):
+        """
+        Elimina el documento de una fila.
+        """
+        cls.objects.filter(entity=instance._meta.model_name, object_id=instance.pk).delete()
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Reconstruye todos los documentos desde las tablas, recorriéndolas por lotes.
+
+        Cada tabla se lee con un cursor del servidor y se inserta de a
+        `batch_size` documentos, así la memoria no crece con la cantidad de
+        filas. Todo ocurre en una transacción: la búsqueda nunca ve la tabla vacía.
+
+        Returns:
+            dict: Cantidad de documentos por entidad.
+        """
+        from .streaming import chunked
+
+        totals = {}
+        with transaction.atomic():
+            cls.objects.all().delete()
+            for model in (Client, Provider, Product, Pet, Veterinary, Medicine):
+                total = 0
+                rows = model.objects.order_by("pk").iterator(chunk_size=batch_size)
+                for batch in chunked(rows, batch_size):
+                    cls.objects.bulk_create([cls.build(instance) for instance in batch])
+                    total += len(batch)
+                totals[model._meta.model_name] = total
+        return totals
+
 
 def validate_client(data):
     """
@@ -84,7 +540,7 @@ def validate_client(data):
 
     return errors
 
-class Client(models.Model):
+class Client(VersionedModel):
     """
     Modelo que representa a un cliente en el sistema.
     """
@@ -93,6 +549,17 @@ class Client(models.Model):
     email = models.EmailField()
     city = models.CharField(max_length=35, choices=CityEnum.choices)
 
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados y
+        # de trigramas para las búsquedas
+        indexes = [
+            models.Index(fields=["name", "id"], name="client_name_id_idx"),
+            models.Index(fields=["phone", "id"], name="client_phone_id_idx"),
+            models.Index(fields=["city", "id"], name="client_city_id_idx"),
+            trigram_index("client", "name"),
+            trigram_index("client", "email"),
+            trigram_index("client", "city"),
+        ]
 
     def __str__(self):
         """
@@ -100,6 +567,12 @@ class Client(models.Model):
         """
         return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: email, teléfono y ciudad.
+        """
+        return self.name, f"{self.email} {self.phone} {self.city}"
+
     @classmethod
     def save_client(cls, client_data):
         """
@@ -155,6 +628,12 @@ class Client(models.Model):
         except (IntegrityError, ValidationError) as e:
             return False, {"error": str(e)}
 
+    def counter_keys(self):
+        """
+        Devuelve las claves de EntityCounter del cliente: el total y el de su ciudad.
+        """
+        return [*super().counter_keys(), EntityCounter.city_key(self.city)]
+
 
 def validate_provider(data):
     """
@@ -187,7 +666,7 @@ def validate_provider(data):
 
     return errors
 
-class Provider(models.Model):
+class Provider(VersionedModel):
     """
     Modelo que representa a un cliente en el sistema.
     """
@@ -195,12 +674,29 @@ class Provider(models.Model):
     email = models.EmailField()
     address = models.CharField(max_length=100)
 
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados y
+        # de trigramas para las búsquedas
+        indexes = [
+            models.Index(fields=["name", "id"], name="provider_name_id_idx"),
+            models.Index(fields=["address", "id"], name="provider_address_id_idx"),
+            trigram_index("provider", "name"),
+            trigram_index("provider", "email"),
+            trigram_index("provider", "address"),
+        ]
+
     def __str__(self):
         """
         Devuelve la representación de cadena de proovedor.
         """
         return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: email y dirección.
+        """
+        return self.name, f"{self.email} {self.address}"
+
     @classmethod
     def save_provider(cls, provider_data):
         """
@@ -297,16 +793,67 @@ def validate_product(data):
         
     return errors
 
-class Product(models.Model):
+class Tag(models.Model):
+    """
+    Etiqueta de productos.
+
+    El nombre es único (y por lo tanto indexado), así el filtro por etiqueta
+    es una búsqueda exacta por índice en lugar de una subcadena de `Product.tag`.
+    """
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        """
+        Devuelve la representación de cadena de la etiqueta.
+        """
+        return self.name
+
+    @staticmethod
+    def parse(text):
+        """
+        Separa un texto de etiquetas separadas por coma, sin espacios, vacías ni repetidas.
+        """
+        names = (name.strip() for name in (text or "").split(","))
+        return list(dict.fromkeys(name for name in names if name))
+
+    @classmethod
+    def ensure(cls, names):
+        """
+        Devuelve las etiquetas con esos nombres, creando las que falten.
+        """
+        if not names:
+            return []
+        cls.objects.bulk_create([cls(name=name) for name in names], ignore_conflicts=True)
+        return list(cls.objects.filter(name__in=names))
+
+
+class Product(VersionedModel):
     """
     Modelo que representa a un producto en el sistema.
     """
     name = models.CharField(max_length=100)
+    # Etiquetas tal como se cargan, separadas por coma; alimentan el vector de
+    # búsqueda. Al guardar se sincronizan con la tabla normalizada `tags`.
     tag = models.CharField(max_length=100)
+    tags = models.ManyToManyField(Tag, related_name="products", blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image_url = models.URLField(null=True, blank=True)  # Campo para almacenar la URL de la imagen en Blob Storage
+    # Nombres de los blobs de las miniaturas WebP (100 y 400 px) de la imagen
+    thumbnail_small = models.CharField(max_length=100, blank=True, default="")
+    thumbnail_large = models.CharField(max_length=100, blank=True, default="")
     description = models.CharField(max_length=500)
     provider = models.ForeignKey("Provider", on_delete=models.PROTECT, null=True, blank=True)
+    # Vector de búsqueda (nombre > etiqueta > descripción); en PostgreSQL lo
+    # mantiene un trigger, en SQLite queda vacío y se busca por subcadena
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados
+        indexes = [
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            models.Index(fields=["price", "id"], name="product_price_id_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+        ]
 
     def __str__(self):
             """
@@ -314,6 +861,26 @@ class Product(models.Model):
             """
             return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: etiquetas y descripción.
+        """
+        return self.name, f"{self.tag} {self.description}"
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda el producto con su texto de etiquetas normalizado.
+        """
+        self.tag = ",".join(Tag.parse(self.tag))
+        super().save(*args, **kwargs)
+
+    def save_related(self, update_fields):
+        """
+        Sincroniza las etiquetas normalizadas con `tag`, antes de cambiar la versión de la tabla.
+        """
+        if update_fields is None or "tag" in update_fields:
+            self.tags.set(Tag.ensure(Tag.parse(self.tag)))
+
     @classmethod
     def save_product(cls, product_data, product_image):
         """
@@ -331,16 +898,22 @@ class Product(models.Model):
         if len(errors.keys()) > 0:
             return False, errors
 
-        # Guardar la imagen en Azure Blob Storage
-        image_url = upload_image_to_azure(product_image)
+        # Guardar la imagen y sus miniaturas en Azure Blob Storage
+        image_url, thumbnails = upload_image_to_azure(product_image)
 
-        Product.objects.create(
-            name=product_data.get("name"),
-            tag=product_data.get("tag"),
-            price=product_data.get("price"),
-            description=product_data.get("description"),
-            image_url=image_url  # Guardar la URL de la imagen
-        )
+        try:
+            with transaction.atomic():
+                Product.objects.create(
+                    name=product_data.get("name"),
+                    tag=product_data.get("tag"),
+                    price=product_data.get("price"),
+                    description=product_data.get("description"),
+                    image_url=image_url,  # Guardar la URL de la imagen
+                    **thumbnails,
+                )
+        except Exception:
+            discard_upload(image_url, thumbnails)
+            raise
     
         return True, "Producto creado exitosamente"
 
@@ -363,67 +936,331 @@ class Product(models.Model):
         self.price = product_data.get("price", "") or self.price
         self.description = product_data.get("description", "") or self.description
 
+        old_image = None
+        new_image_url, thumbnails = None, {}
         if product_image:  # Only update image if a new one is provided
-            # Delete existing image if there was one
-            if self.image_url:
-                delete_image_from_azure(self.image_url)
-
-            # Upload new image and get the URL
-            new_image_url = upload_image_to_azure(product_image)
+            # Upload new image and get the URL. The previous image is kept
+            # until the change is committed
+            new_image_url, thumbnails = upload_image_to_azure(product_image)
 
             # Check if upload was successful before saving
             if new_image_url:
+                old_image = (self.image_url, thumbnail_blobs(self))
                 self.image_url = new_image_url
+                for field, name in thumbnails.items():
+                    setattr(self, field, name)
                 print(f"New image uploaded successfully: {new_image_url}")  # Add logging for debugging
             else:
                 print(f"Error uploading new image!")  # Add logging for debugging
 
-        self.save()
+        try:
+            with transaction.atomic():
+                self.save()
+                if old_image is not None and old_image[0]:
+                    delete_image_from_azure(*old_image)
+        except Exception:
+            discard_upload(new_image_url, thumbnails)
+            raise
         return True,None
         
     def delete(self, *args, **kwargs):
-        # Eliminar la imagen de Azure Blob Storage
-        if self.image_url:
-            delete_image_from_azure(self.image_url)
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            # Eliminar la imagen de Azure Blob Storage al confirmar la transacción
+            if self.image_url:
+                delete_image_from_azure(self.image_url, thumbnail_blobs(self))
+            result = super().delete(*args, **kwargs)
+        return result
 
 def upload_image_to_azure(image_file):
-    if not isinstance(image_file, UploadedFile) or image_file is None:
-        return None
+    """
+    Sube una imagen y sus miniaturas WebP al contenedor de Azure Blob Storage.
 
-    # Generar un nombre único para el archivo
-    unique_name = f"{uuid.uuid4()}"
+    Toma una referencia a la imagen antes de mirar si el blob ya existe, así
+    un borrado pendiente no puede eliminarlo después de decidir reutilizarlo.
+    Quien llama se queda con esa referencia: si la fila no llega a guardarse,
+    debe soltarla con discard_upload.
 
-    # Conectar al servicio de Blob Storage de Azure
-    blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_BLOB_CONNECTION_STRING)
+    Returns:
+        tuple: (URL de la imagen o None, {campo de miniatura: nombre del blob}).
+        Sin miniaturas (archivo que no es una imagen) los campos quedan vacíos.
+    """
+    thumbnails = dict.fromkeys(THUMBNAIL_SIZES, "")
+    if not isinstance(image_file, UploadedFile) or image_file is None:
+        return None, thumbnails
+
+    # El nombre es el SHA-256 del contenido: la misma imagen se sube una sola vez
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    unique_name = digest.hexdigest()
 
     # Obtener una referencia al contenedor en Azure Blob Storage
-    container_client = blob_service_client.get_container_client(settings.AZURE_BLOB_CONTAINER_NAME)
+    container_client = blob_container_client()
+    image_url = f"{config('URL')}{unique_name}"
+
+    # Con la referencia tomada ningún borrado pendiente nuevo toca el blob; los
+    # que ya estaban en curso se evitan volviendo a subirlo (ver store_image)
+    ImageReference.acquire(image_url)
+    try:
+        thumbnails.update(store_image(container_client, image_file, unique_name))
+    except Exception:
+        # Las miniaturas pueden haber quedado subidas aunque falle el original
+        discard_upload(image_url, {field: thumbnail_name(unique_name, field) for field in THUMBNAIL_SIZES})
+        raise
+    return image_url, thumbnails
+
+
+def store_image(container_client, image_file, unique_name):
+    """
+    Sube la imagen y sus miniaturas, o reutiliza las ya subidas con el mismo contenido.
+
+    Un blob con borrados pendientes no se reutiliza: se vuelve a escribir, así
+    el borrado que esté en curso (solo de blobs no modificados) falla y se
+    descarta en el próximo reintento, cuando la imagen ya está referenciada.
+
+    Returns:
+        dict: {campo de miniatura: nombre del blob} de las miniaturas existentes.
+    """
+    thumbnails = {}
+    pending = PendingBlobDeletion.objects.filter(reference=unique_name).exists()
+    if not pending and container_client.get_blob_client(unique_name).exists():
+        # Las miniaturas se suben antes que el original, así que ya existen
+        # (salvo que el archivo no sea una imagen válida)
+        for field in THUMBNAIL_SIZES:
+            name = thumbnail_name(unique_name, field)
+            if container_client.get_blob_client(name).exists():
+                thumbnails[field] = name
+        logger.info("Imagen %s ya subida; se reutiliza el blob", unique_name)
+    else:
+        # Subir la imagen al contenedor. Django ya deja en un archivo temporal las
+        # subidas mayores a FILE_UPLOAD_MAX_MEMORY_SIZE; desde ahí se sube por bloques
+        with image_file.open('rb') as data:
+            thumbnails.update(upload_thumbnails(container_client, unique_name, data))
+
+            data.seek(0)
+            try:
+                upload_blob_stream(
+                    container_client, unique_name, data, image_file.size, overwrite=pending,
+                    content_settings=ContentSettings(
+                        content_type=image_file.content_type, cache_control=IMMUTABLE_CACHE_CONTROL,
+                    ),
+                )
+            except ResourceExistsError:
+                # Otra solicitud subió la misma imagen al mismo tiempo
+                pass
+    return thumbnails
+
+
+@lru_cache(maxsize=1)
+def blob_container_client():
+    """
+    Devuelve el cliente del contenedor de imágenes, creado una vez por proceso.
+
+    El cliente es seguro entre hilos y reutiliza sus conexiones; el tamaño de
+    bloque y el umbral de subida en una sola petición salen de la configuración.
+    """
+    blob_service_client = BlobServiceClient.from_connection_string(
+        settings.AZURE_BLOB_CONNECTION_STRING,
+        max_block_size=settings.AZURE_BLOB_BLOCK_SIZE,
+        max_single_put_size=settings.AZURE_BLOB_SINGLE_PUT_SIZE,
+    )
+    return blob_service_client.get_container_client(settings.AZURE_BLOB_CONTAINER_NAME)
+
+
+def upload_blob_stream(container_client, name, data, length, **kwargs):
+    """
+    Sube un archivo a un blob por bloques en paralelo y registra el throughput.
+
+    Los archivos de más de AZURE_BLOB_SINGLE_PUT_SIZE se suben en bloques de
+    AZURE_BLOB_BLOCK_SIZE, hasta AZURE_BLOB_MAX_CONCURRENCY a la vez, leyendo
+    del archivo cada bloque: en memoria hay a lo sumo un bloque por hilo.
+
+    Args:
+        container_client (ContainerClient): Contenedor de destino.
+        name (str): Nombre del blob.
+        data (file): Archivo abierto y posicionado al inicio.
+        length (int): Tamaño del archivo en bytes.
+        kwargs: Opciones adicionales de upload_blob.
+    """
+    start = time.perf_counter()
+    container_client.get_blob_client(name).upload_blob(
+        data, length=length, max_concurrency=settings.AZURE_BLOB_MAX_CONCURRENCY, **kwargs,
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Blob %s subido: %d bytes en %.3f s (%.2f MB/s)",
+        name, length, elapsed, length / elapsed / 1_000_000 if elapsed else 0,
+    )
+
+
+def upload_thumbnails(container_client, name, data):
+    """
+    Genera y sube las miniaturas de una imagen junto a la original.
+
+    Args:
+        container_client (ContainerClient): Contenedor de las imágenes.
+        name (str): Nombre del blob de la imagen original.
+        data (file): Contenido de la imagen original.
+
+    Returns:
+        dict: {campo de miniatura: nombre del blob}; vacío si no es una imagen válida.
+    """
+    names = {}
+    for field, content in make_thumbnails(data).items():
+        names[field] = thumbnail_name(name, field)
+        upload_blob_stream(
+            container_client, names[field], content, len(content), overwrite=True,
+            content_settings=ContentSettings(content_type="image/webp", cache_control=IMMUTABLE_CACHE_CONTROL),
+        )
+    return names
+
+
+def thumbnail_blobs(instance):
+    """
+    Devuelve los nombres de los blobs de miniaturas registrados en un producto o medicamento.
+    """
+    return [getattr(instance, field) for field in THUMBNAIL_SIZES if getattr(instance, field)]
+
+
+
+def delete_image_from_azure(image_url, thumbnails=()):
+    """
+    Suelta una referencia a una imagen y, si era la última, programa el borrado
+    de la imagen y sus miniaturas de Azure Blob Storage.
 
-    # Subir la imagen al contenedor
-    with image_file.open('rb') as data:
-        blob_client = container_client.get_blob_client(unique_name)
-        blob_client.upload_blob(data)
+    Los blobs se anotan en PendingBlobDeletion en la transacción actual y se
+    borran recién después del commit, en segundo plano: si la transacción se
+    revierte, la imagen sigue referenciada y no se borra nada.
+    """
+    if ImageReference.release(image_url) > 0:
+        return
 
-    # Construir y devolver la URL de la imagen
-    url = config('URL')
-    return f"{url}{unique_name}"
+    # Extraer el nombre del blob (archivo) de la URL
+    blob_name = ImageReference.blob_name(image_url)
+    names = [blob_name, *thumbnails]
+    PendingBlobDeletion.objects.bulk_create(
+        [PendingBlobDeletion(name=name, reference=blob_name) for name in names], ignore_conflicts=True,
+    )
+    transaction.on_commit(lambda: blob_deletion_executor.submit(run_blob_deletions, names))
 
 
+def discard_upload(image_url, thumbnails):
+    """
+    Suelta la referencia que tomó upload_image_to_azure para una fila que no llegó a guardarse.
+    """
+    if image_url:
+        delete_image_from_azure(image_url, [name for name in thumbnails.values() if name])
 
-def delete_image_from_azure(image_url):
-    # Conectar al servicio de Blob Storage de Azure
-    blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_BLOB_CONNECTION_STRING)
 
-    # Extraer el nombre del contenedor y el nombre del blob (archivo) de la URL
-    container_name = settings.AZURE_BLOB_CONTAINER_NAME
-    blob_name = image_url.split("/")[-1]
+def delete_pending_blobs(names=None):
+    """
+    Borra de Azure, por lotes, los blobs pendientes de PendingBlobDeletion.
 
-    # Obtener una referencia al blob (archivo) en Azure Blob Storage
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+    Cada lote es una sola solicitud batch de Azure. Los blobs borrados (o que
+    ya no existían) salen de la tabla; los que fallan quedan con el error y
+    un intento más, para el próximo reintento. Un blob cuya imagen volvió a
+    referenciarse (la misma imagen subida de nuevo) no se borra.
 
-    # Eliminar el blob (archivo) del contenedor
-    blob_client.delete_blob()
+    Args:
+        names (list): Blobs a procesar; por defecto, todos los pendientes.
+
+    Returns:
+        tuple: (cantidad borrada, cantidad fallida).
+    """
+    pending = PendingBlobDeletion.objects.order_by("id")
+    if names is not None:
+        pending = pending.filter(name__in=names)
+
+    container_client = blob_container_client()
+    deleted = failed = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id).values_list("id", "name", "reference")[:BLOB_DELETE_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        done, errors = delete_blob_batch(container_client, batch)
+        deleted += done
+        failed += errors
+
+    if deleted or failed:
+        logger.info("Blobs borrados: %d; con error (se reintentan): %d", deleted, failed)
+    return deleted, failed
+
+
+def delete_blob_batch(container_client, batch):
+    """
+    Borra un lote de blobs pendientes sin bloquear las referencias durante la solicitud a Azure.
+
+    Una transacción corta bloquea las filas de ImageReference del lote
+    (select_for_update) y descarta los blobs cuya imagen volvió a
+    referenciarse. La solicitud batch corre fuera de toda transacción y solo
+    borra los blobs no modificados desde entonces: una subida de la misma
+    imagen que toma la referencia después vuelve a escribir el blob (ver
+    store_image), su borrado falla y queda para reintentar. Una segunda
+    transacción corta registra los resultados y elimina las filas sin
+    referencias cuyos blobs ya no tienen borrados pendientes.
+
+    Args:
+        container_client (ContainerClient): Contenedor de las imágenes.
+        batch (list): Tuplas (id, nombre del blob, imagen) de PendingBlobDeletion.
+
+    Returns:
+        tuple: (cantidad borrada, cantidad fallida).
+    """
+    references = {reference for _, _, reference in batch}
+    with transaction.atomic():
+        # Toda imagen con borrados pendientes necesita su fila para poder bloquearla
+        ImageReference.objects.bulk_create([ImageReference(name=name) for name in references], ignore_conflicts=True)
+        counts = dict(ImageReference.objects.select_for_update().filter(name__in=references).values_list("name", "count"))
+        referenced = {name for name, count in counts.items() if count > 0}
+
+        PendingBlobDeletion.objects.filter(id__in=[pk for pk, _, reference in batch if reference in referenced]).delete()
+        unmodified_since = timezone.now() - BLOB_DELETE_CLOCK_MARGIN
+    batch = [(pk, name) for pk, name, reference in batch if reference not in referenced]
+
+    done, errors = [], {}
+    if batch:
+        try:
+            responses = list(
+                container_client.delete_blobs(
+                    *[name for _, name in batch], raise_on_any_failure=False, if_unmodified_since=unmodified_since,
+                ),
+            )
+        except Exception as error:
+            responses = [error] * len(batch)
+
+        for (pk, name), response in zip(batch, responses):
+            if getattr(response, "status_code", None) in (202, 404):
+                done.append(pk)
+            else:
+                # También 412: el blob se volvió a subir y se revisa en el próximo reintento
+                errors[pk] = str(getattr(response, "reason", response))
+
+    with transaction.atomic():
+        PendingBlobDeletion.objects.filter(id__in=done).delete()
+        for pk, error in errors.items():
+            PendingBlobDeletion.objects.filter(id=pk).update(attempts=F("attempts") + 1, last_error=error[:500])
+
+        ImageReference.objects.filter(name__in=references - referenced, count__lte=0).exclude(
+            name__in=PendingBlobDeletion.objects.values("reference"),
+        ).delete()
+    return len(done), len(errors)
+
+
+def run_blob_deletions(names):
+    """
+    Ejecuta delete_pending_blobs en el hilo de borrados y cierra su conexión a la base.
+
+    Los errores solo se registran: los blobs siguen pendientes y el comando
+    process_blob_deletions los reintenta.
+    """
+    try:
+        delete_pending_blobs(names)
+    except Exception:
+        logger.exception("No se pudieron borrar los blobs %s", names)
+    finally:
+        db.connection.close()
 
 
 
@@ -474,7 +1311,7 @@ def validate_pet(data):
 
     return errors
 
-class Pet(models.Model):
+class Pet(VersionedModel):
     """
     Modelo que representa a una mascota en el sistema.
     """
@@ -486,12 +1323,30 @@ class Pet(models.Model):
     medicines = models.ManyToManyField("Medicine")
     veterinaries = models.ManyToManyField("Veterinary", blank=True)
 
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados y
+        # de trigramas para las búsquedas
+        indexes = [
+            models.Index(fields=["name", "id"], name="pet_name_id_idx"),
+            models.Index(fields=["breed", "id"], name="pet_breed_id_idx"),
+            models.Index(fields=["birthday", "id"], name="pet_birthday_id_idx"),
+            models.Index(fields=["weight", "id"], name="pet_weight_id_idx"),
+            trigram_index("pet", "name"),
+            trigram_index("pet", "breed"),
+        ]
+
     def __str__(self):
             """
             Devuelve la representación de cadena de mascota.
             """
             return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: raza.
+        """
+        return self.name, self.breed
+
     @classmethod
     def save_pet(cls, pet_data):
         """
@@ -575,20 +1430,36 @@ def validate_veterinary(data):
 
     return errors
 
-class Veterinary(models.Model):
+class Veterinary(VersionedModel):
     """
     Modelo que representa a un veterinario en el sistema.
     """
     name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.BigIntegerField()
-    
+
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados y
+        # de trigramas para las búsquedas
+        indexes = [
+            models.Index(fields=["name", "id"], name="veterinary_name_id_idx"),
+            models.Index(fields=["phone", "id"], name="veterinary_phone_id_idx"),
+            trigram_index("veterinary", "name"),
+            trigram_index("veterinary", "email"),
+        ]
+
     def __str__(self):
         """
         Devuelve la representación de cadena de veterinario.
         """
         return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: email y teléfono.
+        """
+        return self.name, f"{self.email} {self.phone}"
+
     @classmethod
     def save_veterinary(cls, veterinary_data):
         """
@@ -673,7 +1544,7 @@ def validate_medicine(data):
             errors["dose"] = "La dosis debe ser un número entero válido"
     return errors
 
-class Medicine(models.Model):
+class Medicine(VersionedModel):
     """
     Modelo que representa una medicina en el sistema.
     """
@@ -681,6 +1552,20 @@ class Medicine(models.Model):
     description = models.CharField(max_length=500)
     dose = models.IntegerField()
     image_url = models.URLField(null=True, blank=True)  # Campo para almacenar la URL de la imagen en Blob Storage
+    # Nombres de los blobs de las miniaturas WebP (100 y 400 px) de la imagen
+    thumbnail_small = models.CharField(max_length=100, blank=True, default="")
+    thumbnail_large = models.CharField(max_length=100, blank=True, default="")
+    # Vector de búsqueda (nombre > descripción); en PostgreSQL lo mantiene un
+    # trigger, en SQLite queda vacío y se busca por subcadena
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Índices (columna, id) para la paginación por cursor de los listados
+        indexes = [
+            models.Index(fields=["name", "id"], name="medicine_name_id_idx"),
+            models.Index(fields=["dose", "id"], name="medicine_dose_id_idx"),
+            GinIndex(fields=["search_vector"], name="medicine_search_vector_idx"),
+        ]
 
     def __str__(self):
         """
@@ -688,6 +1573,12 @@ class Medicine(models.Model):
         """
         return self.name
 
+    def search_text(self):
+        """
+        Devuelve el texto de la búsqueda global: nombre; detalle: descripción.
+        """
+        return self.name, self.description
+
     @classmethod
     def save_medicine(cls, medicine_data,medicine_image):
         
@@ -706,15 +1597,21 @@ class Medicine(models.Model):
         if len(errors.keys()) > 0:
             return False, errors
         
-        # Guardar la imagen en Azure Blob Storage
-        image_url = upload_image_to_azure(medicine_image)
-
-        Medicine.objects.create(
-            name=medicine_data.get("name"),
-            description=medicine_data.get("description"),
-            dose=medicine_data.get("dose"),
-            image_url=image_url,  # Guardar la URL de la imagen
-        )
+        # Guardar la imagen y sus miniaturas en Azure Blob Storage
+        image_url, thumbnails = upload_image_to_azure(medicine_image)
+
+        try:
+            with transaction.atomic():
+                Medicine.objects.create(
+                    name=medicine_data.get("name"),
+                    description=medicine_data.get("description"),
+                    dose=medicine_data.get("dose"),
+                    image_url=image_url,  # Guardar la URL de la imagen
+                    **thumbnails,
+                )
+        except Exception:
+            discard_upload(image_url, thumbnails)
+            raise
 
         return True, None
 
@@ -738,29 +1635,37 @@ class Medicine(models.Model):
         self.description = medicine_data.get("description", "") or self.description
         self.dose = medicine_data.get("dose", "") or self.dose
 
+        old_image = None
+        new_image_url, thumbnails = None, {}
         if medicine_image:  # Only update image if a new one is provided
-            # Delete existing image if there was one
-            if self.image_url:
-                delete_image_from_azure(self.image_url)
-
-            # Upload new image and get the URL
-            new_image_url = upload_image_to_azure(medicine_image)
+            # Upload new image and get the URL. The previous image is kept
+            # until the change is committed
+            new_image_url, thumbnails = upload_image_to_azure(medicine_image)
 
             # Check if upload was successful before saving
             if new_image_url:
+                old_image = (self.image_url, thumbnail_blobs(self))
                 self.image_url = new_image_url
+                for field, name in thumbnails.items():
+                    setattr(self, field, name)
                 print(f"New image uploaded successfully: {new_image_url}")  # Add logging for debugging
             else:
                 print(f"Error uploading new image!")  # Add logging for debugging
 
         try:
-            self.save()
+            with transaction.atomic():
+                self.save()
+                if old_image is not None and old_image[0]:
+                    delete_image_from_azure(*old_image)
             return True, None
         except Exception as e:
+            discard_upload(new_image_url, thumbnails)
             return False, {"errors": str(e)}
     
     def delete(self, *args, **kwargs):
-        # Eliminar la imagen de Azure Blob Storage
-        if self.image_url:
-            delete_image_from_azure(self.image_url)
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        with transaction.atomic():
+            # Eliminar la imagen de Azure Blob Storage al confirmar la transacción
+            if self.image_url:
+                delete_image_from_azure(self.image_url, thumbnail_blobs(self))
+            result = super().delete(*args, **kwargs)
+        return result
\ No newline at end of file
@@ -0,0 +1,272 @@
+import base64
+import json
+
+from django.db import connection
+from django.db.models import Q
+
+# Cantidad de filas por página en los listados
+PAGE_SIZE = 25
+
+# Hasta cuántos resultados se cuentan exactamente; por encima se muestra
+# "más de N" y, en PostgreSQL, la estimación del planificador
+RESULT_COUNT_CAP = 1000
+
+
+def encode_cursor(sort, value, pk, direction):
+    """
+    Codifica la posición de una fila en un cursor opaco para la URL.
+
+    Args:
+        sort (str): Orden activo (por ejemplo "name" o "-price").
+        value: Valor de la columna de orden en la fila límite.
+        pk (int): Id de la fila límite, usado como desempate.
+        direction (str): "next" o "prev".
+
+    Returns:
+        str: Cursor en base64 apto para URL.
+    """
+    payload = json.dumps([sort, value, pk, direction], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Args:
+        cursor (str): Cursor recibido en la URL.
+
+    Returns:
+        tuple or None: (sort, value, pk, direction) o None si el cursor no es válido.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, value, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if direction not in ("next", "prev") or not isinstance(pk, int):
+        return None
+    return sort, value, pk, direction
+
+
+def seek_filter(field, value, pk, descending):
+    """
+    Construye el filtro que posiciona la consulta después de la fila (value, pk).
+
+    Equivale a la comparación de tuplas (field, id) > (value, pk), o < si el
+    orden es descendente, de modo que la base de datos recorre el índice
+    (field, id) sin usar OFFSET.
+    """
+    op = "lt" if descending else "gt"
+    if field == "id":
+        return Q(**{f"id__{op}": pk})
+    return Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": pk})
+
+
+class SortColumn:
+    """
+    Estado de una columna ordenable en el encabezado de la tabla.
+    """
+    def __init__(self, query, active, descending):
+        self.query = query
+        self.active = active
+        self.descending = descending
+
+
+class KeysetPage:
+    """
+    Página de resultados obtenida con paginación por cursor.
+    """
+    def __init__(self, items, sort, has_next, has_previous, next_query, previous_query, columns, stream_query=""):
+        self.items = items
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+        self.columns = columns
+        self.stream_query = stream_query
+
+    def __iter__(self):
+        """
+        Itera sobre las filas de la página.
+        """
+        return iter(self.items)
+
+    def __len__(self):
+        """
+        Devuelve la cantidad de filas de la página.
+        """
+        return len(self.items)
+
+
+def resolve_sort(request, sortable, default_sort="id"):
+    """
+    Obtiene el orden pedido en la URL, validado contra las columnas ordenables.
+
+    Returns:
+        tuple: (sort, field, descending), por ejemplo ("-name", "name", True).
+    """
+    sort = request.GET.get("sort", default_sort)
+    field = sort.lstrip("-")
+    if field != "id" and field not in sortable:
+        sort = default_sort
+        field = sort.lstrip("-")
+    return sort, field, sort.startswith("-")
+
+
+def sort_ordering(field, descending):
+    """
+    Devuelve el order_by para una columna, con el id como desempate.
+    """
+    prefix = "-" if descending else ""
+    return [f"{prefix}{field}"] if field == "id" else [f"{prefix}{field}", f"{prefix}id"]
+
+
+def listing_params(request):
+    """
+    Devuelve una copia de los parámetros GET sin ?fragment, que solo pide la respuesta parcial.
+
+    Así los enlaces de una respuesta parcial llevan a la página completa.
+    """
+    params = request.GET.copy()
+    params.pop("fragment", None)
+    return params
+
+
+def paginate(request, queryset, sortable, default_sort="id", page_size=PAGE_SIZE, row_class=None):
+    """
+    Pagina un queryset buscando por (columna de orden, id) en lugar de OFFSET.
+
+    Args:
+        request (HttpRequest): Solicitud con los parámetros "sort" y "cursor".
+        queryset (QuerySet): Consulta a paginar.
+        sortable (tuple): Columnas por las que el usuario puede ordenar.
+        default_sort (str): Orden usado cuando no se indica uno válido.
+        page_size (int): Cantidad de filas por página.
+        row_class (type): Fila compacta (ListRow) en la que cargar los resultados;
+            si se omite, se devuelven instancias del modelo.
+
+    Returns:
+        KeysetPage: La página pedida junto con los enlaces de navegación.
+    """
+    sort, field, descending = resolve_sort(request, sortable, default_sort)
+
+    cursor = decode_cursor(request.GET.get("cursor", ""))
+    if cursor is not None and cursor[0] != sort:
+        cursor = None
+    backwards = cursor is not None and cursor[3] == "prev"
+
+    # Para ir hacia atrás se recorre el índice en sentido inverso y luego se
+    # invierten las filas obtenidas.
+    scan_descending = descending != backwards
+    if cursor is not None:
+        queryset = queryset.filter(seek_filter(field, cursor[1], cursor[2], scan_descending))
+
+    queryset = queryset.order_by(*sort_ordering(field, scan_descending))
+    if row_class is not None:
+        queryset = row_class.project(queryset)
+    items = list(queryset[: page_size + 1])
+    if row_class is not None:
+        items = row_class.wrap(items)
+
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    def page_query(item, direction):
+        params = listing_params(request)
+        params["sort"] = sort
+        params["cursor"] = encode_cursor(sort, getattr(item, field), item.id, direction)
+        return params.urlencode()
+
+    next_query = page_query(items[-1], "next") if has_next and items else ""
+    previous_query = page_query(items[0], "prev") if has_previous and items else ""
+
+    columns = {}
+    for column in ("id", *sortable):
+        params = listing_params(request)
+        params.pop("cursor", None)
+        active = column == field
+        params["sort"] = column if active and descending or not active else f"-{column}"
+        columns[column] = SortColumn(params.urlencode(), active, descending)
+
+    params = listing_params(request)
+    params.pop("cursor", None)
+    params["sort"] = sort
+    params["stream"] = "1"
+
+    return KeysetPage(
+        items, sort, has_next, has_previous, next_query, previous_query, columns, params.urlencode(),
+    )
+
+
+class ResultCount:
+    """
+    Cantidad de resultados de un listado, exacta o acotada.
+
+    Attributes:
+        value (int): Cantidad exacta, o el tope si hay más resultados.
+        capped (bool): Si hay más de `value` resultados.
+        estimate (int or None): Estimación del planificador cuando se superó el tope.
+    """
+    def __init__(self, value, capped=False, estimate=None):
+        self.value = value
+        self.capped = capped
+        self.estimate = estimate
+
+    def __str__(self):
+        """
+        Devuelve el texto para mostrar, por ejemplo "más de 1000 resultados (aprox. 48000)".
+        """
+        if not self.capped:
+            return f"{self.value} resultado{'' if self.value == 1 else 's'}"
+        text = f"más de {self.value} resultados"
+        if self.estimate and self.estimate > self.value:
+            text += f" (aprox. {self.estimate})"
+        return text
+
+
+def planner_estimate(queryset):
+    """
+    Devuelve la cantidad de filas que el planificador de PostgreSQL estima para un queryset.
+
+    Returns:
+        int or None: La estimación, o None en otras bases de datos.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_results(queryset, cap=None, total=None):
+    """
+    Cuenta los resultados de un listado sin recorrer más de `cap` filas.
+
+    El conteo se hace sobre la consulta limitada a cap + 1 filas, así una
+    búsqueda amplia no escanea la tabla entera una segunda vez solo para
+    mostrar el total.
+
+    Args:
+        queryset (QuerySet): Consulta del listado, ya filtrada.
+        cap (int): Máximo de filas a contar; por defecto, RESULT_COUNT_CAP.
+        total (int): Total ya conocido (por ejemplo, de un contador); si se
+            indica, no se consulta la base de datos.
+
+    Returns:
+        ResultCount: La cantidad exacta o "más de `cap`".
+    """
+    if total is not None:
+        return ResultCount(total)
+    cap = RESULT_COUNT_CAP if cap is None else cap
+    value = queryset.order_by()[: cap + 1].count()
+    if value <= cap:
+        return ResultCount(value)
+    return ResultCount(cap, capped=True, estimate=planner_estimate(queryset))
@@ -0,0 +1,149 @@
+from collections import defaultdict
+
+from .models import Product
+
+
+class ListRow:
+    """
+    Fila compacta de un listado: solo las columnas que muestra la tabla.
+
+    Las subclases declaran en __slots__ los atributos que usa el template y,
+    en `lookups`, el campo de la consulta cuando difiere del nombre del
+    atributo (por ejemplo una columna de una tabla relacionada). Las filas se
+    cargan con values_list, sin construir instancias completas del modelo.
+    Los atributos de `attached` no salen de esa consulta: los completa
+    `attach` para todas las filas juntas (por ejemplo, una relación muchos a
+    muchos en una consulta más).
+    """
+    __slots__ = ()
+    lookups = {}
+    attached = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.columns(), values):
+            setattr(self, name, value)
+
+    @classmethod
+    def columns(cls):
+        """
+        Devuelve los atributos que salen de la consulta principal.
+        """
+        return [name for name in cls.__slots__ if name not in cls.attached]
+
+    @classmethod
+    def fields(cls):
+        """
+        Devuelve los campos a pedir en values_list, en el orden de columns().
+        """
+        return [cls.lookups.get(name, name) for name in cls.columns()]
+
+    @staticmethod
+    def attach(rows):
+        """
+        Completa los atributos de `attached` de las filas; por defecto no hay ninguno.
+        """
+
+    @classmethod
+    def project(cls, queryset):
+        """
+        Restringe un queryset a las columnas de la fila.
+        """
+        return queryset.values_list(*cls.fields())
+
+    @classmethod
+    def wrap(cls, values):
+        """
+        Convierte tuplas de values_list en filas.
+        """
+        rows = [cls(row) for row in values]
+        cls.attach(rows)
+        return rows
+
+    @classmethod
+    def fetch(cls, queryset):
+        """
+        Ejecuta el queryset y devuelve la lista de filas.
+        """
+        return cls.wrap(cls.project(queryset))
+
+
+class ClientRow(ListRow):
+    """
+    Fila del listado de clientes.
+    """
+    __slots__ = ("id", "name", "phone", "email", "city")
+
+
+class ProviderRow(ListRow):
+    """
+    Fila del listado de proveedores.
+    """
+    __slots__ = ("id", "name", "email", "address")
+
+
+def attach_tags(rows):
+    """
+    Carga los nombres de las etiquetas de las filas de productos en una sola consulta.
+    """
+    tags = defaultdict(list)
+    if rows:
+        product_tags = Product.tags.through.objects.filter(product_id__in=[row.id for row in rows])
+        for product_id, name in product_tags.order_by("id").values_list("product_id", "tag__name"):
+            tags[product_id].append(name)
+    for row in rows:
+        row.tags = tags[row.id]
+
+
+class ProductRow(ListRow):
+    """
+    Fila del listado de productos, con el nombre del proveedor y sus etiquetas.
+
+    Las versiones del producto y de su proveedor forman la clave de la caché
+    del fragmento de la fila.
+    """
+    __slots__ = (
+        "id", "name", "price", "provider", "description", "image_url", "thumbnail_small",
+        "thumbnail_large", "updated_at", "provider_updated_at", "tags",
+    )
+    lookups = {"provider": "provider__name", "provider_updated_at": "provider__updated_at"}
+    attached = ("tags",)
+    attach = staticmethod(attach_tags)
+
+
+class RankedProductRow(ListRow):
+    """
+    Fila del listado de productos con la relevancia de la búsqueda de texto.
+    """
+    __slots__ = (*ProductRow.__slots__, "rank")
+    lookups = ProductRow.lookups
+    attached = ProductRow.attached
+    attach = staticmethod(attach_tags)
+
+
+class PetRow(ListRow):
+    """
+    Fila del listado de mascotas, con el nombre del dueño.
+    """
+    __slots__ = ("id", "name", "breed", "birthday", "weight", "client")
+    lookups = {"client": "client__name"}
+
+
+class VeterinaryRow(ListRow):
+    """
+    Fila del listado de veterinarios.
+    """
+    __slots__ = ("id", "name", "email", "phone")
+
+
+class MedicineRow(ListRow):
+    """
+    Fila del listado de medicamentos.
+    """
+    __slots__ = ("id", "name", "description", "dose", "image_url", "thumbnail_small", "thumbnail_large", "updated_at")
+
+
+class RankedMedicineRow(ListRow):
+    """
+    Fila del listado de medicamentos con la relevancia de la búsqueda de texto.
+    """
+    __slots__ = (*MedicineRow.__slots__, "rank")
@@ -0,0 +1,373 @@
+import re
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import CharField, F, Func, Q, TextField, Transform
+from django.dispatch import receiver
+
+from .cache import table_versions
+
+# Configuración de texto de PostgreSQL: stemming y stopwords en español, sin
+# acentos (se crea en la migración 0036)
+SEARCH_CONFIG = "spanish_unaccent"
+
+# Máximo de ids que se guardan por búsqueda; las búsquedas más amplias no se
+# cachean (se resuelven con la consulta y el conteo acotado de siempre)
+RESULT_CACHE_MAX_IDS = 1000
+
+# Cantidad máxima de dígitos de un teléfono (E.164), para los rangos por prefijo
+PHONE_MAX_DIGITS = 15
+
+# Formatos de fecha aceptados en el buscador: (expresión, partes presentes)
+DATE_FORMATS = [
+    (re.compile(r"^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})$"), "day"),
+    (re.compile(r"^(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})$"), "day"),
+    (re.compile(r"^(?P<year>\d{4})-(?P<month>\d{1,2})$"), "month"),
+    (re.compile(r"^(?P<month>\d{1,2})/(?P<year>\d{4})$"), "month"),
+    (re.compile(r"^(?P<year>(19|20)\d{2})$"), "year"),
+]
+
+
+def normalize(text):
+    """
+    Pasa un texto a minúsculas y sin acentos ("Morón" -> "moron").
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class ImmutableUnaccent(Func):
+    """
+    Quita los acentos de un texto en la base de datos.
+
+    En PostgreSQL `immutable_unaccent` envuelve a `unaccent` (que no es
+    IMMUTABLE) para poder usarla en índices; en SQLite es una función de
+    Python registrada al abrir la conexión.
+    """
+    function = "immutable_unaccent"
+    output_field = TextField()
+
+
+class Normalized(Transform):
+    """
+    Transformación `__normalized`: unaccent(lower(columna)), comparable con normalize().
+    """
+    lookup_name = "normalized"
+    output_field = TextField()
+
+    def as_sql(self, compiler, connection):
+        """
+        Compila la columna como immutable_unaccent(LOWER(columna)), la expresión de los índices.
+        """
+        sql, params = compiler.compile(self.lhs)
+        return f"immutable_unaccent(LOWER({sql}))", params
+
+
+CharField.register_lookup(Normalized)
+TextField.register_lookup(Normalized)
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    """
+    Registra immutable_unaccent en las conexiones SQLite (en PostgreSQL la crea una migración).
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "immutable_unaccent", 1, lambda text: None if text is None else normalize(text), deterministic=True,
+        )
+
+
+def contains_text(field, text):
+    """
+    Condición de subcadena sin distinguir mayúsculas ni acentos, resuelta con el índice de la columna.
+    """
+    return Q(**{f"{field}__normalized__contains": normalize(text)})
+
+
+def supports_full_text():
+    """
+    Indica si la base de datos permite búsqueda de texto completo (PostgreSQL).
+    """
+    return connection.vendor == "postgresql"
+
+
+def text_search(queryset, query, fields, extra=None, prefiltered=False):
+    """
+    Filtra un queryset por texto, ordenable por relevancia en PostgreSQL.
+
+    En PostgreSQL busca en la columna search_vector (índice GIN) y anota
+    `rank` con la relevancia de cada fila. En otras bases (SQLite en los
+    tests) busca la subcadena en `fields`, sin acentos, y no anota ranking.
+
+    Args:
+        queryset (QuerySet): Consulta de un modelo con search_vector.
+        query (str): Texto ingresado por el usuario.
+        fields (tuple): Columnas cubiertas por el vector, para el camino sin PostgreSQL.
+        extra (Q): Condiciones que se suman con OR (columnas fuera del vector).
+        prefiltered (bool): Si el queryset ya está restringido a los resultados
+            (ids de la caché de búsquedas); solo se anota la relevancia.
+
+    Returns:
+        tuple: (queryset filtrado, True si las filas tienen `rank`).
+    """
+    extra = extra if extra is not None else Q()
+
+    if not supports_full_text():
+        if prefiltered:
+            return queryset, False
+        condition = Q()
+        for field in fields:
+            condition |= contains_text(field, query)
+        return queryset.filter(condition | extra), False
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    queryset = queryset.annotate(rank=SearchRank(F("search_vector"), search_query))
+    if prefiltered:
+        return queryset, True
+    return queryset.filter(Q(search_vector=search_query) | extra), True
+
+
+class ResultIdCache:
+    """
+    Caché LRU por proceso de los ids que devolvió cada búsqueda.
+
+    Las entradas se desalojan de la menos usada a la más usada cuando el
+    tamaño estimado supera `budget` bytes. Es segura entre hilos.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def entry_size(key, ids):
+        """
+        Estima los bytes que ocupa una entrada: clave, tupla e ids.
+        """
+        return sys.getsizeof(key) + sys.getsizeof(ids) + sum(sys.getsizeof(pk) for pk in ids)
+
+    def get(self, key):
+        """
+        Devuelve los ids guardados para `key` (o None) y la marca como la más reciente.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, ids):
+        """
+        Guarda los ids de una búsqueda y desaloja las entradas más viejas si hace falta.
+        """
+        size = self.entry_size(key, ids)
+        if size > self.budget:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (ids, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        """
+        Vacía la caché.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+result_ids = ResultIdCache(settings.SEARCH_RESULT_CACHE_BYTES)
+
+# Marca de las búsquedas con más de RESULT_CACHE_MAX_IDS resultados
+BROAD_SEARCH = ("broad",)
+
+
+def cached_ids(queryset, query, models):
+    """
+    Devuelve los ids de una búsqueda, desde la caché o consultándolos una vez.
+
+    La clave es el modelo, la consulta normalizada (sin espacios de los
+    extremos, mayúsculas ni acentos, igual que la búsqueda) y la versión de
+    las tablas de `models`: cualquier escritura en ellas invalida la entrada.
+
+    Args:
+        queryset (QuerySet): Búsqueda ya filtrada.
+        query (str): Texto ingresado por el usuario.
+        models (tuple): Modelos cuyas tablas afectan el resultado.
+
+    Returns:
+        tuple or None: Los ids, o None si la búsqueda supera RESULT_CACHE_MAX_IDS.
+    """
+    key = (queryset.model._meta.label_lower, normalize(query.strip()), *table_versions(*models))
+    ids = result_ids.get(key)
+    if ids is None:
+        ids = tuple(queryset.order_by().values_list("pk", flat=True)[: RESULT_CACHE_MAX_IDS + 1])
+        if len(ids) > RESULT_CACHE_MAX_IDS:
+            # Se recuerda que es amplia para no volver a pedir sus ids
+            ids = BROAD_SEARCH
+        result_ids.put(key, ids)
+    return None if ids is BROAD_SEARCH else ids
+
+
+def cached_filter(queryset, condition, query, models):
+    """
+    Filtra un queryset por una búsqueda, resolviendo los resultados con los ids cacheados.
+
+    Con los ids en caché la consulta del listado es un único `pk__in`, sin
+    volver a evaluar la condición de búsqueda.
+    """
+    ids = cached_ids(queryset.filter(condition), query, models)
+    if ids is None:
+        return queryset.filter(condition)
+    return queryset.filter(pk__in=ids)
+
+
+def cached_text_search(queryset, query, fields, extra=None, models=()):
+    """
+    Igual que text_search, pero resolviendo los resultados con los ids cacheados.
+
+    Returns:
+        tuple: (queryset filtrado, True si las filas tienen `rank`).
+    """
+    filtered, ranked = text_search(queryset, query, fields, extra)
+    ids = cached_ids(filtered, query, models or (queryset.model,))
+    if ids is None:
+        return filtered, ranked
+    return text_search(queryset.filter(pk__in=ids), query, fields, prefiltered=True)
+
+
+class SearchTerm:
+    """
+    Término de búsqueda clasificado según los tipos de columna que puede encontrar.
+
+    Attributes:
+        text (str): El término tal como se escribió, para las columnas de texto.
+        digits (str or None): El término si son solo dígitos (prefijo de teléfono).
+        number_range (tuple or None): Rango [desde, hasta) de valores numéricos que
+            se escriben así; "12" cubre de 12 a 13 y "12.5" de 12.5 a 12.6.
+        date_range (tuple or None): Rango [desde, hasta) de fechas; un año, un mes
+            o un día según lo que se haya escrito.
+    """
+    def __init__(self, query):
+        self.text = query.strip()
+        self.digits = self.text if self.text.isdigit() else None
+        self.number_range = parse_number_range(self.text)
+        self.date_range = parse_date_range(self.text)
+
+
+def parse_number_range(text):
+    """
+    Interpreta un número (con punto o coma decimal) como el rango de valores que lo empiezan.
+
+    Returns:
+        tuple or None: (desde, hasta) como Decimal, o None si no es un número.
+    """
+    if not re.fullmatch(r"\d+([.,]\d+)?", text):
+        return None
+    try:
+        value = Decimal(text.replace(",", "."))
+    except InvalidOperation:
+        return None
+    step = Decimal(1).scaleb(value.as_tuple().exponent)
+    return value, value + step
+
+
+def parse_date_range(text):
+    """
+    Interpreta una fecha completa, un mes o un año como un rango de fechas.
+
+    Returns:
+        tuple or None: (desde, hasta) como date, o None si no es una fecha válida.
+    """
+    for pattern, precision in DATE_FORMATS:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        parts = match.groupdict()
+        year = int(parts["year"])
+        month = int(parts.get("month") or 1)
+        day = int(parts.get("day") or 1)
+        try:
+            start = date(year, month, day)
+            if precision == "day":
+                end = date.fromordinal(start.toordinal() + 1)
+            elif precision == "month":
+                end = date(year + month // 12, month % 12 + 1, 1)
+            else:
+                end = date(year + 1, 1, 1)
+        except ValueError:
+            return None
+        return start, end
+    return None
+
+
+def prefix_ranges(field, digits):
+    """
+    Arma la búsqueda por prefijo de una columna numérica de enteros (teléfonos).
+
+    Un prefijo como "5422" equivale a los rangos [5422, 5423), [54220, 54230), ...
+    hasta PHONE_MAX_DIGITS dígitos, que el índice B-tree de la columna resuelve
+    sin convertir cada fila a texto.
+    """
+    condition = Q()
+    if digits.startswith("0"):
+        return condition
+    value = int(digits)
+    for extra in range(PHONE_MAX_DIGITS - len(digits) + 1):
+        scale = 10 ** extra
+        condition |= Q(**{f"{field}__gte": value * scale, f"{field}__lt": (value + 1) * scale})
+    return condition
+
+
+def plan_search(query, text=(), prefix=(), numbers=(), dates=()):
+    """
+    Arma el filtro de una búsqueda eligiendo, para cada tipo de columna, una consulta indexable.
+
+    Las columnas de texto se buscan siempre por subcadena, sin distinguir
+    mayúsculas ni acentos (índices de trigramas en PostgreSQL). Las numéricas y de fecha solo se agregan si el
+    término tiene esa forma, como rangos que usan sus índices B-tree. Todas las
+    condiciones se combinan con OR, igual que antes.
+
+    Args:
+        query (str): Texto ingresado por el usuario.
+        text (tuple): Columnas de texto.
+        prefix (tuple): Columnas enteras buscadas por prefijo (teléfonos).
+        numbers (tuple): Columnas numéricas (precio, peso, dosis).
+        dates (tuple): Columnas de fecha.
+
+    Returns:
+        Q: Condición para filtrar el queryset.
+    """
+    term = SearchTerm(query)
+    condition = Q()
+    for field in text:
+        condition |= contains_text(field, term.text)
+    if term.digits:
+        for field in prefix:
+            condition |= prefix_ranges(field, term.digits)
+    if term.number_range:
+        start, end = term.number_range
+        for field in numbers:
+            condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    if term.date_range:
+        start, end = term.date_range
+        for field in dates:
+            condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
@@ -0,0 +1,74 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+# Filas que se leen por vuelta del cursor del servidor y se envían juntas
+STREAM_CHUNK_SIZE = 500
+
+# Marca que separa el encabezado y el pie de la página del cuerpo de la tabla
+STREAM_MARKER = "<!-- vetsoft:filas -->"
+
+
+def chunked(iterable, size):
+    """
+    Agrupa un iterable en listas de hasta `size` elementos.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def stream_repository(request, template_name, rows_template_name, context_name, queryset, context=None, chunk_size=STREAM_CHUNK_SIZE, row_class=None):
+    """
+    Envía un listado completo en partes, sin armar la tabla entera en memoria.
+
+    La página se renderiza una vez sin filas y se corta en la marca del
+    <tbody>; luego las filas se leen con un cursor del servidor
+    (QuerySet.iterator) y se renderizan y envían de a `chunk_size`.
+
+    Args:
+        request (HttpRequest): La solicitud HTTP actual.
+        template_name (str): Template de la página del listado.
+        rows_template_name (str): Template que renderiza solo las filas.
+        context_name (str): Nombre de la variable con las filas en los templates.
+        queryset (QuerySet): Consulta ya filtrada y ordenada.
+        context (dict): Contexto adicional para ambos templates.
+        chunk_size (int): Filas por parte enviada.
+        row_class (type): Fila compacta (ListRow) en la que cargar los resultados.
+
+    Returns:
+        StreamingHttpResponse: Respuesta que se genera a medida que se envía.
+    """
+    context = dict(context or {})
+
+    # Las filas se renderizan después de los middlewares: el token CSRF debe
+    # pedirse antes para que la cookie salga en la respuesta.
+    get_token(request)
+
+    page = render_to_string(
+        template_name,
+        {**context, context_name: [], "stream_marker": mark_safe(STREAM_MARKER)},
+        request,
+    )
+    head, tail = page.split(STREAM_MARKER, 1)
+    rows_template = get_template(rows_template_name)
+
+    if row_class is not None:
+        queryset = row_class.project(queryset)
+
+    def generate():
+        yield head
+        empty = True
+        for chunk in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+            empty = False
+            if row_class is not None:
+                chunk = row_class.wrap(chunk)
+            yield rows_template.render({**context, context_name: chunk}, request)
+        if empty:
+            yield rows_template.render({**context, context_name: []}, request)
+        yield tail
+
+    return StreamingHttpResponse(generate(), content_type="text/html; charset=utf-8")
@@ -1,28 +1,136 @@
 # filters.py
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
 from django import template
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import (
+    BlobSasPermissions,
+    BlobServiceClient,
+    ContainerSasPermissions,
+    generate_blob_sas,
+    generate_container_sas,
+)
+from decouple import config
 from django.conf import settings
-from datetime import datetime, timedelta
 
 register = template.Library()
 
-@register.filter
-def generate_sas_token(image_url):
+# Los tokens se firman por intervalos alineados al reloj: durante un intervalo
+# cada imagen tiene siempre el mismo token (y la misma URL, que el navegador
+# puede cachear). Un token entregado sigue valiendo al menos SAS_VALIDITY.
+SAS_BUCKET = timedelta(minutes=30)
+SAS_VALIDITY = timedelta(hours=1)
+
+# Cantidad máxima de tokens por blob firmados que se guardan por proceso
+SAS_CACHE_SIZE = 4096
+
+_sas_lock = threading.Lock()
+_sas_token = (None, "")  # (inicio del intervalo, token)
+
+
+@lru_cache(maxsize=1)
+def account_credentials():
+    """
+    Devuelve (nombre de la cuenta, clave) del connection string, leídos una vez por proceso.
+    """
     blob_service_client = BlobServiceClient.from_connection_string(settings.AZURE_BLOB_CONNECTION_STRING)
-    container_name = settings.AZURE_BLOB_CONTAINER_NAME
-    blob_name = image_url.split("/")[-1]
-    
-    sas_token = generate_blob_sas(
-        account_name=blob_service_client.account_name,
-        container_name=container_name,
+    return blob_service_client.account_name, blob_service_client.credential.account_key
+
+
+def sas_bucket(now):
+    """
+    Devuelve el inicio del intervalo de SAS_BUCKET que contiene `now`.
+    """
+    size = SAS_BUCKET.total_seconds()
+    return datetime.fromtimestamp(now.timestamp() // size * size, tz=timezone.utc)
+
+
+def container_sas(now=None):
+    """
+    Devuelve el token SAS de lectura del contenedor de imágenes para el intervalo actual.
+
+    Se firma una sola vez por intervalo y proceso; vence SAS_VALIDITY después
+    del fin del intervalo, así que nunca se entrega uno a punto de vencer.
+    """
+    global _sas_token
+    start = sas_bucket(now or datetime.now(timezone.utc))
+    with _sas_lock:
+        if _sas_token[0] != start:
+            account_name, account_key = account_credentials()
+            token = generate_container_sas(
+                account_name=account_name,
+                container_name=settings.AZURE_BLOB_CONTAINER_NAME,
+                account_key=account_key,
+                permission=ContainerSasPermissions(read=True),
+                expiry=start + SAS_BUCKET + SAS_VALIDITY,
+            )
+            _sas_token = (start, token)
+        return _sas_token[1]
+
+
+@lru_cache(maxsize=SAS_CACHE_SIZE)
+def signed_blob_sas(blob_name, start):
+    """
+    Firma el token SAS de lectura de un solo blob para el intervalo que empieza en `start`.
+    """
+    account_name, account_key = account_credentials()
+    return generate_blob_sas(
+        account_name=account_name,
+        container_name=settings.AZURE_BLOB_CONTAINER_NAME,
         blob_name=blob_name,
-        account_key=blob_service_client.credential.account_key,
+        account_key=account_key,
         permission=BlobSasPermissions(read=True),
-        expiry=datetime.utcnow() + timedelta(hours=1)  # Expira en una hora
+        expiry=start + SAS_BUCKET + SAS_VALIDITY,
     )
-    # prueba
-    return f"?{sas_token}"
+
+
+def blob_sas(blob_name, now=None):
+    """
+    Devuelve el token SAS de lectura de un solo blob para el intervalo actual.
+
+    Se firma una vez por blob, intervalo y proceso; una URL filtrada solo da
+    acceso a esa imagen.
+    """
+    return signed_blob_sas(blob_name, sas_bucket(now or datetime.now(timezone.utc)))
+
+
+def sas_token(blob_name, now=None):
+    """
+    Devuelve el token SAS de lectura de un blob.
+
+    Es un token del blob, salvo que AZURE_BLOB_CONTAINER_SAS active el token
+    de todo el contenedor (uno solo por intervalo, que da acceso a todas las
+    imágenes).
+    """
+    if settings.AZURE_BLOB_CONTAINER_SAS:
+        return container_sas(now)
+    return blob_sas(blob_name, now)
+
+
+@register.filter
+def generate_sas_token(image_url):
+    """
+    Devuelve la query string con el token SAS de lectura para la URL de una imagen.
+
+    Sin URL (fila sin imagen) no hay blob que firmar y devuelve una cadena vacía.
+    """
+    if not image_url:
+        return ""
+    return f"?{sas_token(image_url.split('/')[-1])}"
+
+
+@register.filter
+def blob_url(blob_name):
+    """
+    Devuelve la URL de un blob del contenedor de imágenes a partir de su nombre.
+    """
+    return f"{config('URL')}{blob_name}"
+
 
 @register.filter
-def split_string(value, separator):
-    return value.split(separator)
\ No newline at end of file
+def signed_blob_url(blob_name):
+    """
+    Devuelve la URL de un blob del contenedor de imágenes con su token SAS de lectura.
+    """
+    return f"{blob_url(blob_name)}?{sas_token(blob_name)}"
@@ -1,13 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 
 import os
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.shortcuts import reverse
+from django.core.cache import cache, caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from app.models import Client, Medicine, Pet, Product, Provider
+from app.models import Client, EntityCounter, Medicine, Pet, Product, Provider, SearchDocument, Veterinary
+from app.search import result_ids
 
 
 # Obtengo ruta actual app
@@ -37,6 +43,19 @@ class HomePageTest(TestCase):
         Esta función compara que el response y el home sean iguales.
         """
 
+    def test_home_shows_totals_in_one_query(self):
+        """
+        Esta función verifica que el tablero del inicio lea los totales en una sola consulta.
+        """
+        Client.save_client({"name": "Ana", "phone": "54221", "email": "ana@vetsoft.com", "city": "Morón"})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("home"))
+
+        self.assertEqual(response.context["totals"]["client"], 1)
+        self.assertEqual(response.context["cities"], [("Morón", 1)])
+        self.assertContains(response, "1 registrados")
+
 class ClientsTest(TestCase):
     """
     Pruebas para el repositorio de clientes.
@@ -596,3 +615,691 @@ class ProductsTest(TestCase):
 
         # Verificar que se muestra un mensaje de error en la respuesta
         self.assertContains(response, "El precio debe ser un número")
+
+
+class RepositoryPaginationTest(TestCase):
+    """
+    Pruebas para la paginación por cursor de los listados.
+    """
+    def setUp(self):
+        """
+        Crea más clientes de los que entran en una página.
+        """
+        for i in range(30):
+            Client.objects.create(
+                name=f"Cliente {i:02d}",
+                phone=54221000000 + i,
+                email=f"cliente{i}@vetsoft.com",
+                city="La Plata",
+            )
+
+    def test_repo_shows_first_page_with_next_link(self):
+        """
+        Esta función verifica que el listado se corte en una página y ofrezca el enlace siguiente.
+        """
+        response = self.client.get(reverse("clients_repo"))
+
+        self.assertEqual(len(response.context["clients"]), 25)
+        self.assertTrue(response.context["page"].next_query)
+        self.assertFalse(response.context["page"].previous_query)
+
+    def test_can_follow_next_and_previous_cursors(self):
+        """
+        Esta función verifica que los cursores siguiente y anterior devuelvan las filas correctas.
+        """
+        first = self.client.get(reverse("clients_repo"))
+        second = self.client.get(f"{reverse('clients_repo')}?{first.context['page'].next_query}")
+
+        self.assertEqual([c.name for c in second.context["clients"]], [f"Cliente {i:02d}" for i in range(25, 30)])
+        self.assertFalse(second.context["page"].next_query)
+
+        back = self.client.get(f"{reverse('clients_repo')}?{second.context['page'].previous_query}")
+        self.assertEqual(
+            [c.id for c in back.context["clients"]],
+            [c.id for c in first.context["clients"]],
+        )
+
+    def test_can_sort_descending_by_name(self):
+        """
+        Esta función verifica el orden descendente por nombre en la paginación.
+        """
+        response = self.client.get(reverse("clients_repo"), {"sort": "-name"})
+        names = [c.name for c in response.context["clients"]]
+
+        self.assertEqual(names[0], "Cliente 29")
+        self.assertEqual(names, sorted(names, reverse=True))
+
+        following = self.client.get(f"{reverse('clients_repo')}?{response.context['page'].next_query}")
+        self.assertEqual(following.context["clients"][0].name, "Cliente 04")
+
+    def test_search_keeps_query_in_page_links(self):
+        """
+        Esta función verifica que la búsqueda conserve el término al paginar.
+        """
+        response = self.client.get(reverse("clients_search"), {"search": "Cliente"})
+
+        self.assertIn("search=Cliente", response.context["page"].next_query)
+
+
+class ListingQueryCountTest(TestCase):
+    """
+    Pruebas que fallan si la cantidad de consultas de un listado crece con las filas.
+    """
+    def create_rows(self, count):
+        """
+        Crea `count` filas de cada entidad, con sus relaciones cargadas.
+        """
+        for i in range(count):
+            provider = Provider.objects.create(name=f"Proveedor {i}", email="p@vetsoft.com", address="Calle 1")
+            client = Client.objects.create(name=f"Cliente {i}", phone=54221000000 + i, email="c@vetsoft.com", city="La Plata")
+            Product.objects.create(name=f"Producto {i}", tag="a,b", price=10, description="a", provider=provider)
+            Pet.objects.create(name=f"Mascota {i}", breed="a", birthday="2020-01-01", weight=3, client=client)
+            Veterinary.objects.create(name=f"Veterinario {i}", email="v@vetsoft.com", phone=54221000000 + i)
+            Medicine.objects.create(name=f"Medicina {i}", description="a", dose=1)
+
+    def count_queries(self, url, params):
+        """
+        Devuelve la cantidad de consultas ejecutadas al pedir la URL.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryCountDoesNotScale(self, url, params=None):
+        """
+        Compara las consultas de un listado con una fila y con muchas filas.
+        """
+        for model in (Pet, Product, Client, Provider, Veterinary, Medicine):
+            model.objects.all().delete()
+        self.create_rows(1)
+        with_one_row = self.count_queries(url, params)
+        self.create_rows(10)
+        self.assertEqual(self.count_queries(url, params), with_one_row, url)
+
+    def test_repository_views_do_not_scale_queries_with_rows(self):
+        """
+        Esta función verifica que los listados carguen sus relaciones en un número fijo de consultas.
+        """
+        for name in ("clients_repo", "provider_repo", "product_repo", "pet_repo", "veterinary_repo", "medicine_repo"):
+            with self.subTest(name):
+                self.assertQueryCountDoesNotScale(reverse(name))
+
+    def test_search_views_do_not_scale_queries_with_rows(self):
+        """
+        Esta función verifica que las búsquedas carguen sus relaciones en un número fijo de consultas.
+        """
+        for name in ("clients_search", "provider_search", "product_search", "pet_search", "veterinary_search", "medicine_search"):
+            with self.subTest(name):
+                self.assertQueryCountDoesNotScale(reverse(name), {"search": "a"})
+
+
+class ResultCountTest(TestCase):
+    """
+    Pruebas para la cantidad de resultados de los listados.
+    """
+    def setUp(self):
+        """
+        Crea 30 clientes, más de una página.
+        """
+        for i in range(30):
+            Client.save_client({"name": "Cliente", "phone": f"54221{i:04d}", "email": f"c{i}@vetsoft.com", "city": "La Plata"})
+
+    def test_repository_total_comes_from_counter(self):
+        """
+        Esta función verifica que el listado sin filtro muestre el total del contador.
+        """
+        response = self.client.get(reverse("clients_repo"))
+        self.assertContains(response, "30 resultados")
+
+    def test_stale_counter_falls_back_to_count(self):
+        """
+        Esta función verifica que un contador con menos filas de las que muestra la página no se use.
+        """
+        EntityCounter.objects.filter(key="client").update(value=3)
+
+        response = self.client.get(reverse("clients_repo"))
+
+        self.assertContains(response, "30 resultados")
+        self.assertNotContains(response, "3 resultados")
+
+    def test_search_count_is_capped(self):
+        """
+        Esta función verifica que una búsqueda amplia cuente hasta el tope y muestre "más de N".
+        """
+        with mock.patch("app.pagination.RESULT_COUNT_CAP", 10):
+            response = self.client.get(reverse("clients_search"), {"search": "cliente"})
+
+        self.assertContains(response, "más de 10 resultados")
+
+    def test_single_page_needs_no_count_query(self):
+        """
+        Esta función verifica que una búsqueda que entra en una página no haga un conteo aparte.
+        """
+        Client.objects.filter(id__gt=Client.objects.order_by("id")[1].id).delete()
+        self.client.get(reverse("clients_search"), {"search": "cliente"})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("clients_search"), {"search": "cliente"})
+
+        self.assertContains(response, "2 resultados")
+
+
+class ProductTagFilterTest(TestCase):
+    """
+    Pruebas para el filtro de productos por etiqueta.
+    """
+    def setUp(self):
+        """
+        Crea dos productos con etiquetas que comparten texto.
+        """
+        Product.objects.create(name="Pipeta", tag="perro,gato", price=10, description="lorem")
+        Product.objects.create(name="Collar", tag="perros grandes", price=10, description="lorem")
+
+    def test_filter_is_exact(self):
+        """
+        Esta función verifica que ?tag= filtre por la etiqueta exacta, no por subcadena.
+        """
+        response = self.client.get(reverse("product_repo"), {"tag": "perro"})
+
+        self.assertEqual([product.name for product in response.context["products"]], ["Pipeta"])
+        self.assertEqual(response.context["products"][0].tags, ["perro", "gato"])
+
+    def test_filter_combines_with_search(self):
+        """
+        Esta función verifica que el filtro por etiqueta se aplique también sobre una búsqueda.
+        """
+        response = self.client.get(reverse("product_search"), {"search": "lorem", "tag": "perros grandes"})
+
+        self.assertEqual([product.name for product in response.context["products"]], ["Collar"])
+
+    def test_listing_shows_tag_counts(self):
+        """
+        Esta función verifica que el listado muestre cada etiqueta con su cantidad de productos.
+        """
+        response = self.client.get(reverse("product_repo"))
+
+        tags = response.context["facets"][2]["values"]
+        self.assertEqual([(value["label"], value["count"]) for value in tags], [("gato", 1), ("perro", 1), ("perros grandes", 1)])
+        self.assertContains(response, "?tag=perros+grandes")
+
+
+class ProductFacetTest(TestCase):
+    """
+    Pruebas para las facetas de la búsqueda de productos.
+    """
+    def setUp(self):
+        """
+        Crea productos de dos proveedores y distintos precios.
+        """
+        cache.clear()
+        self.provider = Provider.objects.create(name="Proveedor A", email="a@vetsoft.com", address="Calle 1")
+        other = Provider.objects.create(name="Proveedor B", email="b@vetsoft.com", address="Calle 2")
+        Product.objects.create(name="Pipeta", tag="perro", price=500, description="lorem", provider=self.provider)
+        Product.objects.create(name="Collar", tag="perro", price=3000, description="lorem", provider=self.provider)
+        Product.objects.create(name="Correa", tag="gato", price=800, description="lorem", provider=other)
+
+    def test_filters_combine_with_search(self):
+        """
+        Esta función verifica que los filtros por proveedor y precio se apliquen sobre la búsqueda.
+        """
+        response = self.client.get(
+            reverse("product_search"), {"search": "lorem", "provider": self.provider.id, "price": "0-1000"},
+        )
+
+        self.assertEqual([product.name for product in response.context["products"]], ["Pipeta"])
+
+    def test_counts_follow_active_filters(self):
+        """
+        Esta función verifica que los conteos reflejen los filtros elegidos y que el valor activo lo quite.
+        """
+        response = self.client.get(reverse("product_search"), {"search": "lorem", "price": "0-1000"})
+
+        providers, prices, tags = response.context["facets"]
+        self.assertEqual([(value["label"], value["count"]) for value in providers["values"]], [("Proveedor A", 1), ("Proveedor B", 1)])
+        self.assertEqual(prices["values"][0]["label"], "Hasta $1000")
+        self.assertTrue(prices["values"][0]["active"])
+        self.assertEqual(prices["values"][0]["query"], "search=lorem")
+        self.assertEqual([(value["label"], value["count"]) for value in tags["values"]], [("gato", 1), ("perro", 1)])
+
+    def test_invalid_facet_values_are_ignored(self):
+        """
+        Esta función verifica que un proveedor o rango de precio inválido no filtre.
+        """
+        response = self.client.get(reverse("product_repo"), {"provider": "abc", "price": "1-2"})
+
+        self.assertEqual(len(response.context["products"]), 3)
+
+
+class SearchResultCacheTest(TestCase):
+    """
+    Pruebas para la caché de ids de resultados de las búsquedas.
+    """
+    def setUp(self):
+        """
+        Crea dos clientes.
+        """
+        result_ids.clear()
+        Client.objects.create(name="Ana", phone=54221000001, email="ana@vetsoft.com", city="La Plata")
+        Client.objects.create(name="Juan", phone=54221000002, email="juan@vetsoft.com", city="Berisso")
+
+    def test_repeated_search_loads_rows_by_id(self):
+        """
+        Esta función verifica que una búsqueda repetida traiga las filas con un único pk__in.
+        """
+        self.client.get(reverse("clients_search"), {"search": "ana"})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("clients_search"), {"search": " ANA"})
+
+        self.assertContains(response, "ana@vetsoft.com")
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertIn(" IN (", queries.captured_queries[0]["sql"])
+
+    def test_write_invalidates_cached_ids(self):
+        """
+        Esta función verifica que una escritura en la tabla invalide los ids guardados.
+        """
+        self.client.get(reverse("clients_search"), {"search": "ana"})
+        Client.objects.create(name="Anabel", phone=54221000003, email="anabel@vetsoft.com", city="La Plata")
+
+        response = self.client.get(reverse("clients_search"), {"search": "ana"})
+
+        self.assertContains(response, "anabel@vetsoft.com")
+
+
+class RepositoryStreamingTest(TestCase):
+    """
+    Pruebas para el modo de listado completo enviado en partes.
+    """
+    def test_stream_sends_every_row(self):
+        """
+        Esta función verifica que el modo stream envíe todas las filas, sin paginar.
+        """
+        for i in range(30):
+            Client.objects.create(name=f"Cliente {i:02d}", phone=54221000000 + i, email="c@vetsoft.com", city="La Plata")
+
+        response = self.client.get(reverse("clients_repo"), {"stream": "1", "sort": "-name"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(content.count('name="client_id"'), 30)
+        self.assertLess(content.index("Cliente 29"), content.index("Cliente 00"))
+        self.assertIn("</html>", content)
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_stream_shows_empty_message(self):
+        """
+        Esta función verifica el mensaje de tabla vacía en el modo stream.
+        """
+        response = self.client.get(reverse("pet_search"), {"stream": "1", "search": "Luna"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertIn("No existen mascotas", content)
+
+
+class SearchFragmentTest(TestCase):
+    """
+    Pruebas para las respuestas parciales de la búsqueda mientras se escribe.
+    """
+    def test_fragment_returns_only_rows(self):
+        """
+        Esta función verifica que ?fragment=rows devuelva solo las filas que coinciden, sin paginación si entran en una página.
+        """
+        Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="La Plata")
+        Client.objects.create(name="Juan", phone=54222, email="juan@vetsoft.com", city="Berisso")
+
+        response = self.client.get(reverse("clients_search"), {"search": "Ana", "fragment": "rows"})
+        content = response.content.decode()
+
+        self.assertContains(response, "ana@vetsoft.com")
+        self.assertNotContains(response, "juan@vetsoft.com")
+        self.assertTrue(content.strip().startswith("<tr>"))
+        self.assertNotIn("<nav", content)
+        self.assertNotIn("<script", content)
+
+    def test_fragment_for_every_search(self):
+        """
+        Esta función verifica que todas las búsquedas acepten la variante parcial.
+        """
+        names = ["clients_search", "provider_search", "product_search", "pet_search", "veterinary_search", "medicine_search"]
+        for name in names:
+            with self.subTest(view=name):
+                full = self.client.get(reverse(name), {"search": "zz"})
+                fragment = self.client.get(reverse(name), {"search": "zz", "fragment": "rows"})
+
+                self.assertContains(fragment, "No existen")
+                self.assertContains(full, "data-live-search")
+                self.assertLess(len(fragment.content) * 10, len(full.content))
+
+    def test_fragment_brings_count_and_pager(self):
+        """
+        Esta función verifica que la respuesta parcial traiga el total y la paginación de la búsqueda.
+        """
+        for index in range(30):
+            Client.objects.create(
+                name=f"Ana {index}", phone=54221, email=f"ana{index}@vetsoft.com", city="La Plata",
+            )
+        Client.objects.create(name="Juan", phone=54222, email="juan@vetsoft.com", city="Berisso")
+
+        response = self.client.get(reverse("clients_search"), {"search": "Ana", "fragment": "rows"})
+        content = response.content.decode()
+
+        self.assertIn("data-live-parts", content)
+        self.assertIn("30 resultados", content)
+        self.assertIn("Siguiente", content)
+        self.assertIn("cursor=", content)
+        self.assertNotIn("fragment=rows", content)
+        self.assertNotIn("<script", content)
+
+
+class TypedSearchTest(TestCase):
+    """
+    Pruebas para las búsquedas por fecha y por número en los listados.
+    """
+    def setUp(self):
+        """
+        Crea dos mascotas con distinta fecha de nacimiento y peso.
+        """
+        Pet.objects.create(name="Luna", breed="Siames", birthday="2020-03-15", weight=4.5)
+        Pet.objects.create(name="Toby", breed="Caniche", birthday="2018-07-01", weight=12)
+
+    def test_pet_search_by_date(self):
+        """
+        Esta función verifica la búsqueda de mascotas por fecha, mes o año de nacimiento.
+        """
+        for query in ("2020", "2020-03", "15/03/2020"):
+            with self.subTest(query=query):
+                response = self.client.get(reverse("pet_search"), {"search": query})
+                self.assertContains(response, "Luna")
+                self.assertNotContains(response, "Toby")
+
+    def test_pet_search_by_weight(self):
+        """
+        Esta función verifica la búsqueda de mascotas por peso, con coma o punto decimal.
+        """
+        for query, found, missing in (("12", "Toby", "Luna"), ("4,5", "Luna", "Toby"), ("4.5", "Luna", "Toby")):
+            with self.subTest(query=query):
+                response = self.client.get(reverse("pet_search"), {"search": query})
+                self.assertContains(response, found)
+                self.assertNotContains(response, missing)
+
+
+class AccentInsensitiveSearchTest(TestCase):
+    """
+    Pruebas para las búsquedas sin distinguir acentos ni mayúsculas.
+    """
+    def test_client_search_ignores_accents(self):
+        """
+        Esta función verifica que "moron" y "LANUS" encuentren ciudades con acento.
+        """
+        Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="Morón")
+        Client.objects.create(name="Juan", phone=54222, email="juan@vetsoft.com", city="Lanús")
+
+        self.assertContains(self.client.get(reverse("clients_search"), {"search": "moron"}), "Ana")
+        response = self.client.get(reverse("clients_search"), {"search": "LANUS"})
+        self.assertContains(response, "Juan")
+        self.assertNotContains(response, "Ana")
+
+    def test_accented_query_matches_plain_text(self):
+        """
+        Esta función verifica que una consulta con acentos encuentre texto sin acentos.
+        """
+        Medicine.objects.create(name="Antibiotico", description="Amplio espectro", dose=5)
+        Veterinary.objects.create(name="Ramon", email="ramon@vetsoft.com", phone=54221)
+
+        self.assertContains(self.client.get(reverse("medicine_search"), {"search": "antibiótico"}), "Antibiotico")
+        self.assertContains(self.client.get(reverse("veterinary_search"), {"search": "Ramón"}), "Ramon")
+
+
+class GlobalSearchTest(TestCase):
+    """
+    Pruebas para la búsqueda global sobre la tabla de documentos.
+    """
+    def setUp(self):
+        """
+        Crea un cliente, una mascota y un medicamento que se llaman parecido.
+        """
+        self.owner = Client.objects.create(name="Luna Pérez", phone=54221, email="luna@vetsoft.com", city="La Plata")
+        self.pet = Pet.objects.create(name="Luna", breed="Siames", birthday="2020-01-01", weight=3, client=self.owner)
+        Medicine.objects.create(name="Lunaril", description="Antiparasitario", dose=2)
+        Veterinary.objects.create(name="Marcos", email="marcos@vetsoft.com", phone=54222)
+
+    def test_finds_every_entity(self):
+        """
+        Esta función verifica que una búsqueda encuentre filas de distintas entidades.
+        """
+        response = self.client.get(reverse("global_search"), {"search": "Luna"})
+
+        self.assertContains(response, "Cliente")
+        self.assertContains(response, "Mascota")
+        self.assertContains(response, "Medicamento")
+        self.assertContains(response, reverse("pet_history", kwargs={"id": self.pet.id}))
+        self.assertContains(response, reverse("clients_edit", kwargs={"id": self.owner.id}))
+        self.assertNotContains(response, "Marcos")
+
+    def test_documents_follow_updates_and_deletes(self):
+        """
+        Esta función verifica que el documento se actualice al editar y se borre al eliminar.
+        """
+        self.pet.update_pet({"name": "Sol", "breed": "Siames", "birthday": "2020-01-01", "weight": 3})
+        self.assertEqual(SearchDocument.objects.get(entity="pet", object_id=self.pet.id).title, "Sol")
+
+        self.pet.delete()
+        self.assertFalse(SearchDocument.objects.filter(entity="pet").exists())
+
+
+class AutocompleteTest(TestCase):
+    """
+    Pruebas para el autocompletado servido desde el índice en memoria.
+    """
+    def setUp(self):
+        """
+        Limpia la caché (cambia las versiones de las tablas) y crea dos clientes.
+        """
+        cache.clear()
+        Client.objects.create(name="Luna Pérez", phone=54221, email="luna@vetsoft.com", city="La Plata")
+        Client.objects.create(name="Lucas Gómez", phone=54222, email="lucas@vetsoft.com", city="Berisso")
+
+    def test_prefix_lookup_without_queries(self):
+        """
+        Esta función verifica el autocompletado por prefijo de cualquier palabra, sin consultas una vez cargado.
+        """
+        url = reverse("autocomplete", kwargs={"entity": "client"})
+        self.assertEqual(len(self.client.get(url, {"q": "lu"}).json()["results"]), 2)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "PERE"})
+
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["Luna Pérez"])
+
+    def test_writes_update_index_incrementally(self):
+        """
+        Esta función verifica que las escrituras confirmadas se apliquen al índice sin recargarlo.
+        """
+        url = reverse("autocomplete", kwargs={"entity": "client"})
+        self.client.get(url, {"q": "lu"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(name="Lucía Díaz", phone=54223, email="lucia@vetsoft.com", city="La Plata")
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.get(name="Lucas Gómez").delete()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "luc"})
+
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["Lucía Díaz"])
+
+    def test_unknown_entity(self):
+        """
+        Esta función verifica que una entidad sin autocompletado devuelva 404.
+        """
+        response = self.client.get(reverse("autocomplete", kwargs={"entity": "pet"}), {"q": "lu"})
+        self.assertEqual(response.status_code, 404)
+
+
+class PageCacheTest(TestCase):
+    """
+    Pruebas para la caché de listados invalidada por escrituras.
+    """
+    def setUp(self):
+        """
+        Limpia la caché y le da al navegador de prueba una cookie CSRF.
+        """
+        cache.clear()
+        self.client.cookies["csrftoken"] = "a" * 32
+
+    def test_cached_page_is_served_without_queries(self):
+        """
+        Esta función verifica que la segunda visita a un listado no consulte la base de datos.
+        """
+        Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="La Plata")
+        first = self.client.get(reverse("clients_repo"))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("clients_repo"))
+
+        self.assertEqual(first.content, second.content)
+
+    def test_write_invalidates_cached_page(self):
+        """
+        Esta función verifica que guardar un cliente invalide el listado en caché.
+        """
+        self.client.get(reverse("clients_repo"))
+
+        Client.save_client({"name": "Ana", "phone": "54221", "email": "ana@vetsoft.com", "city": "La Plata"})
+
+        self.assertContains(self.client.get(reverse("clients_repo")), "Ana")
+
+    def test_related_table_write_invalidates_cached_page(self):
+        """
+        Esta función verifica que renombrar un proveedor invalide el listado de productos.
+        """
+        provider = Provider.objects.create(name="Proveedor Viejo", email="p@vetsoft.com", address="Calle 1")
+        Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem", provider=provider)
+        self.assertContains(self.client.get(reverse("product_repo")), "Proveedor Viejo")
+
+        provider.update_provider({"name": "Proveedor Nuevo", "email": "p@vetsoft.com", "address": "Calle 1"})
+
+        self.assertContains(self.client.get(reverse("product_repo")), "Proveedor Nuevo")
+
+    def test_page_is_not_cached_without_csrf_cookie(self):
+        """
+        Esta función verifica que no se cachee una página para quien no tiene cookie CSRF.
+        """
+        self.client.cookies.pop("csrftoken")
+        self.client.get(reverse("clients_repo"))
+        self.client.cookies.pop("csrftoken", None)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("clients_repo"))
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Pruebas para los GET condicionales (ETag / Last-Modified) de los listados.
+    """
+    def setUp(self):
+        """
+        Limpia la caché y le da al navegador de prueba una cookie CSRF.
+        """
+        cache.clear()
+        self.client.cookies["csrftoken"] = "a" * 32
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """
+        Esta función verifica que un ETag vigente se responda con 304 sin consultar la base de datos.
+        """
+        Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="La Plata")
+        first = self.client.get(reverse("clients_repo"), {"sort": "name"})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(
+                reverse("clients_repo"), {"sort": "name"}, HTTP_IF_NONE_MATCH=first["ETag"],
+            )
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_write_changes_etag(self):
+        """
+        Esta función verifica que una escritura en la tabla invalide el ETag anterior.
+        """
+        etag = self.client.get(reverse("clients_repo"))["ETag"]
+
+        Client.save_client({"name": "Ana", "phone": "54221", "email": "ana@vetsoft.com", "city": "La Plata"})
+        response = self.client.get(reverse("clients_repo"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Ana")
+
+    def test_query_string_is_part_of_etag(self):
+        """
+        Esta función verifica que dos búsquedas distintas no compartan ETag.
+        """
+        first = self.client.get(reverse("clients_search"), {"search": "Ana"})
+        second = self.client.get(reverse("clients_search"), {"search": "Juan"}, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_pet_history_depends_on_medicines(self):
+        """
+        Esta función verifica que el historial de una mascota cambie de ETag al editar un medicamento.
+        """
+        client = Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="La Plata")
+        pet = Pet.objects.create(name="Firulais", breed="Perro", birthday="2020-01-01", weight=10, client=client)
+        url = reverse("pet_history", kwargs={"id": pet.id})
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Medicine.objects.create(name="Amoxicilina", description="Antibiótico", dose=5)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_image_pages_change_etag_with_sas_bucket(self):
+        """
+        Esta función verifica que los listados con imágenes firmadas no respondan 304 en otro intervalo
+        de firma, cuando los tokens SAS de la página guardada pueden haber vencido.
+        """
+        start = datetime(2024, 1, 1, 10, 0, tzinfo=dt_timezone.utc)
+        with mock.patch("app.templatetags.filters.sas_bucket", return_value=start):
+            etag = self.client.get(reverse("product_repo"))["ETag"]
+            self.assertEqual(self.client.get(reverse("product_repo"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with mock.patch("app.templatetags.filters.sas_bucket", return_value=start + timedelta(minutes=30)):
+            response = self.client.get(reverse("product_repo"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class RowFragmentCacheTest(TestCase):
+    """
+    Pruebas para la caché de fragmentos de las filas de productos.
+    """
+    def setUp(self):
+        """
+        Limpia la caché de fragmentos y crea un producto con imagen.
+        """
+        caches["template_fragments"].clear()
+        self.product = Product.objects.create(
+            name="Pipeta", tag="perro,gato", price=10, description="lorem",
+            image_url="https://vetsoft.blob.core.windows.net/imagenes/pipeta",
+        )
+
+    @mock.patch("app.templatetags.filters.sas_token", return_value="sig=1")
+    def test_unchanged_rows_are_not_rendered_again(self, sas_token):
+        """
+        Esta función verifica que una fila sin cambios reutilice su fragmento y una modificada no.
+        """
+        self.client.get(reverse("product_repo"))
+        self.client.get(reverse("product_repo"), {"sort": "name"})
+        self.assertEqual(sas_token.call_count, 1)
+
+        self.product.name = "Pipeta Nueva"
+        self.product.save()
+        response = self.client.get(reverse("product_repo"), {"sort": "-name"})
+
+        self.assertEqual(sas_token.call_count, 2)
+        self.assertContains(response, "Pipeta Nueva")
@@ -1,18 +1,56 @@
+import hashlib
 import os
-
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
 from django.test import TestCase
 from django.utils import timezone
+from PIL import Image
 
+from app.cache import bump_table_version, table_versions
+from app.facets import count_query, facet_counts
 from app.models import (
     Client,
+    EntityCounter,
+    ImageReference,
     Medicine,
+    PendingBlobDeletion,
     Pet,
     Product,
     Provider,
+    SearchDocument,
+    Tag,
+    blob_container_client,
+    delete_image_from_azure,
+    delete_pending_blobs,
+    upload_image_to_azure,
+    upload_thumbnails,
     validate_client,
     validate_pet,
 )
+from app.pagination import count_results
+from app.rows import PetRow, ProductRow
+from app.search import (
+    ResultIdCache,
+    SearchTerm,
+    cached_ids,
+    normalize,
+    plan_search,
+    result_ids,
+    text_search,
+)
+from app.templatetags import filters
+from app.thumbnails import make_thumbnails
+from app.warmup import template_names, warm_up, warm_up_server
 
 # Obtengo ruta actual app
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -483,3 +521,851 @@ class ProductModelTest(TestCase):
         self.assertIn("price", message_or_errors)
         self.assertEqual(message_or_errors["price"], "El precio debe ser mayor que cero")
 
+
+class SasTokenTest(TestCase):
+    """
+    Pruebas para los tokens SAS de las imágenes.
+    """
+    def setUp(self):
+        """
+        Olvida los tokens y las credenciales que hayan quedado de otras pruebas, y los
+        que dejen estas (firmados con credenciales simuladas).
+        """
+        self.clear_tokens()
+        self.addCleanup(self.clear_tokens)
+
+    @staticmethod
+    def clear_tokens():
+        """
+        Olvida el token del contenedor, los tokens por blob y las credenciales de la cuenta.
+        """
+        filters._sas_token = (None, "")
+        filters.signed_blob_sas.cache_clear()
+        filters.account_credentials.cache_clear()
+
+    @mock.patch("app.templatetags.filters.generate_blob_sas", side_effect=lambda **kwargs: f"sig={kwargs['blob_name']}")
+    @mock.patch("app.templatetags.filters.BlobServiceClient")
+    def test_signs_each_blob_once_per_bucket(self, blob_service_client, generate_blob_sas):
+        """
+        Esta función verifica que cada blob tenga su propio token, firmado una vez por intervalo.
+        """
+        start = datetime(2024, 1, 1, 10, 0, tzinfo=dt_timezone.utc)
+
+        for minutes in (0, 10, 29):
+            self.assertEqual(filters.blob_sas("a", start + timedelta(minutes=minutes)), "sig=a")
+        self.assertEqual(filters.blob_sas("b", start), "sig=b")
+        self.assertEqual(generate_blob_sas.call_count, 2)
+        self.assertEqual(
+            generate_blob_sas.call_args.kwargs["expiry"], start + filters.SAS_BUCKET + filters.SAS_VALIDITY,
+        )
+
+        filters.blob_sas("a", start + timedelta(minutes=30))
+
+        self.assertEqual(generate_blob_sas.call_count, 3)
+        self.assertEqual(blob_service_client.from_connection_string.call_count, 1)
+
+    @mock.patch("app.templatetags.filters.generate_container_sas", return_value="sig=1")
+    @mock.patch("app.templatetags.filters.BlobServiceClient")
+    def test_container_token_is_opt_in(self, blob_service_client, generate_container_sas):
+        """
+        Esta función verifica que el token del contenedor se use solo con AZURE_BLOB_CONTAINER_SAS.
+        """
+        start = datetime(2024, 1, 1, 10, 0, tzinfo=dt_timezone.utc)
+
+        with mock.patch("app.templatetags.filters.blob_sas", return_value="sig=a") as blob_sas:
+            self.assertEqual(filters.sas_token("a", start), "sig=a")
+            with self.settings(AZURE_BLOB_CONTAINER_SAS=True):
+                self.assertEqual(filters.sas_token("a", start), "sig=1")
+                self.assertEqual(filters.sas_token("b", start + timedelta(minutes=29)), "sig=1")
+
+        blob_sas.assert_called_once_with("a", start)
+        self.assertEqual(generate_container_sas.call_count, 1)
+
+    @mock.patch("app.templatetags.filters.sas_token", side_effect=lambda name: f"sig={name}")
+    def test_filters_sign_the_given_blob(self, sas_token):
+        """
+        Esta función verifica que los filtros firmen el blob de la URL o del nombre recibido.
+        """
+        self.assertEqual(filters.generate_sas_token("https://vetsoft.blob.core.windows.net/imagenes/a"), "?sig=a")
+        self.assertEqual(filters.generate_sas_token(None), "")
+        self.assertEqual(filters.signed_blob_url("a_100.webp"), f"{filters.blob_url('a_100.webp')}?sig=a_100.webp")
+
+
+class ThumbnailTest(TestCase):
+    """
+    Pruebas para las miniaturas de las imágenes.
+    """
+    def test_makes_webp_thumbnails_keeping_aspect(self):
+        """
+        Esta función verifica que se generen miniaturas WebP de 100 y 400 px sin deformar la imagen.
+        """
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 500), "red").save(buffer, "PNG")
+        buffer.seek(0)
+
+        thumbnails = make_thumbnails(buffer)
+
+        sizes = {}
+        for field, content in thumbnails.items():
+            with Image.open(BytesIO(content)) as thumbnail:
+                self.assertEqual(thumbnail.format, "WEBP")
+                sizes[field] = thumbnail.size
+        self.assertEqual(sizes, {"thumbnail_small": (100, 50), "thumbnail_large": (400, 200)})
+
+    def test_invalid_image_has_no_thumbnails(self):
+        """
+        Esta función verifica que un archivo que no es una imagen no genere miniaturas.
+        """
+        self.assertEqual(make_thumbnails(BytesIO(b"no es una imagen")), {})
+
+    def test_uploads_thumbnails_next_to_original(self):
+        """
+        Esta función verifica que las miniaturas se suban con nombres derivados del original.
+        """
+        container_client = mock.Mock()
+        names = upload_thumbnails(container_client, "abc", BytesIO(image_data))
+
+        self.assertEqual(names, {"thumbnail_small": "abc_100.webp", "thumbnail_large": "abc_400.webp"})
+        uploaded = [call.args[0] for call in container_client.get_blob_client.call_args_list]
+        self.assertEqual(uploaded, ["abc_100.webp", "abc_400.webp"])
+
+    @mock.patch("app.management.commands.backfill_thumbnails.blob_container_client")
+    def test_backfill_skips_failed_images(self, blob_container_client):
+        """
+        Esta función verifica que el relleno de miniaturas siga con las demás imágenes si una falla.
+        """
+        url = "https://vetsoft.blob.core.windows.net/imagenes/"
+        missing = Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem", image_url=url + "a")
+        product = Product.objects.create(name="Collar", tag="perro", price=10, description="lorem", image_url=url + "b")
+
+        def get_blob_client(name):
+            blob_client = mock.Mock()
+            if name == "a":
+                blob_client.download_blob.side_effect = Exception("BlobNotFound")
+            else:
+                blob_client.download_blob.return_value.readall.return_value = image_data
+            return blob_client
+
+        blob_container_client.return_value.get_blob_client.side_effect = get_blob_client
+        out = StringIO()
+        with self.assertLogs("app.management.commands.backfill_thumbnails", "ERROR"):
+            call_command("backfill_thumbnails", stdout=out)
+
+        product.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(product.thumbnail_small, "b_100.webp")
+        self.assertEqual(missing.thumbnail_small, "")
+        self.assertIn(f"product: 1 completadas, 1 con error, último id {product.id}", out.getvalue())
+
+
+class ImageUploadTest(TestCase):
+    """
+    Pruebas para la subida de imágenes a Blob Storage.
+    """
+    @mock.patch("app.models.BlobServiceClient")
+    def test_client_is_built_once_with_block_settings(self, blob_service_client):
+        """
+        Esta función verifica que el cliente del contenedor se cree una vez, con el tamaño de bloque configurado.
+        """
+        blob_container_client.cache_clear()
+        self.addCleanup(blob_container_client.cache_clear)
+
+        self.assertIs(blob_container_client(), blob_container_client())
+
+        blob_service_client.from_connection_string.assert_called_once()
+        kwargs = blob_service_client.from_connection_string.call_args.kwargs
+        self.assertEqual(kwargs["max_block_size"], settings.AZURE_BLOB_BLOCK_SIZE)
+        self.assertEqual(kwargs["max_single_put_size"], settings.AZURE_BLOB_SINGLE_PUT_SIZE)
+
+    @mock.patch("app.models.blob_container_client")
+    def test_upload_streams_with_bounded_concurrency(self, blob_container_client):
+        """
+        Esta función verifica que la imagen se suba desde el archivo, con su tamaño y concurrencia acotada,
+        y que se registre el throughput.
+        """
+        blob_client = blob_container_client.return_value.get_blob_client.return_value
+        blob_client.exists.return_value = False
+        upload = SimpleUploadedFile("pipeta.png", image_data, content_type="image/png")
+
+        with self.assertLogs("app.models", "INFO") as logs:
+            url, thumbnails = upload_image_to_azure(upload)
+
+        # Las miniaturas se suben antes que el original
+        original = blob_client.upload_blob.call_args_list[-1]
+        self.assertEqual(original.kwargs["length"], len(image_data))
+        self.assertEqual(original.kwargs["max_concurrency"], settings.AZURE_BLOB_MAX_CONCURRENCY)
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn("MB/s", logs.output[-1])
+        self.assertTrue(thumbnails["thumbnail_small"].startswith(url.split("/")[-1]))
+
+    @mock.patch("app.models.blob_container_client")
+    def test_identical_images_share_one_blob(self, blob_container_client):
+        """
+        Esta función verifica que la imagen se nombre por su SHA-256 y que, si ya existe, no se vuelva a subir.
+        """
+        blob_client = blob_container_client.return_value.get_blob_client.return_value
+        blob_client.exists.return_value = True
+
+        url, thumbnails = upload_image_to_azure(SimpleUploadedFile("otra.png", image_data, content_type="image/png"))
+
+        digest = hashlib.sha256(image_data).hexdigest()
+        self.assertTrue(url.endswith(digest))
+        self.assertEqual(thumbnails["thumbnail_small"], f"{digest}_100.webp")
+        blob_client.upload_blob.assert_not_called()
+
+
+class ImageReferenceTest(TestCase):
+    """
+    Pruebas para el conteo de referencias a los blobs de imágenes.
+    """
+    @mock.patch("app.models.blob_deletion_executor")
+    def test_blob_is_deleted_with_last_reference(self, executor):
+        """
+        Esta función verifica que el borrado del blob y sus miniaturas se programe solo al soltar
+        la última referencia, y recién después del commit.
+        """
+        url = "https://vetsoft.blob.core.windows.net/imagenes/abc"
+        ImageReference.acquire(url)
+        ImageReference.acquire(url)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            delete_image_from_azure(url, ["abc_100.webp"])
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_image_from_azure(url, ["abc_100.webp"])
+            executor.submit.assert_not_called()
+        self.assertEqual(sorted(PendingBlobDeletion.objects.values_list("name", flat=True)), ["abc", "abc_100.webp"])
+        # La fila queda sin referencias hasta que se borren los blobs
+        self.assertEqual(ImageReference.objects.get(name="abc").count, 0)
+
+        callbacks[0]()
+        self.assertEqual(executor.submit.call_args.args[1], ["abc", "abc_100.webp"])
+
+    @mock.patch("app.models.blob_container_client")
+    def test_pending_blobs_are_deleted_in_one_batch(self, blob_container_client):
+        """
+        Esta función verifica que los blobs pendientes se borren en una sola solicitud batch
+        y que los fallidos queden para reintentar.
+        """
+        for name in ("abc", "abc_100.webp", "def"):
+            PendingBlobDeletion.objects.create(name=name, reference=name.split("_")[0])
+        delete_blobs = blob_container_client.return_value.delete_blobs
+        delete_blobs.return_value = [
+            mock.Mock(status_code=202), mock.Mock(status_code=404), mock.Mock(status_code=500, reason="Server Error"),
+        ]
+
+        self.assertEqual(delete_pending_blobs(), (2, 1))
+
+        self.assertEqual(delete_blobs.call_args.args, ("abc", "abc_100.webp", "def"))
+        self.assertFalse(delete_blobs.call_args.kwargs["raise_on_any_failure"])
+        pending = PendingBlobDeletion.objects.get()
+        self.assertEqual((pending.name, pending.attempts, pending.last_error), ("def", 1, "Server Error"))
+        # Solo queda la fila de la imagen con borrados pendientes
+        self.assertEqual(list(ImageReference.objects.values_list("name", "count")), [("def", 0)])
+
+    @mock.patch("app.models.blob_container_client")
+    def test_referenced_blob_is_not_deleted(self, blob_container_client):
+        """
+        Esta función verifica que no se borre un blob cuya imagen volvió a referenciarse antes del borrado.
+        """
+        url = "https://vetsoft.blob.core.windows.net/imagenes/abc"
+        PendingBlobDeletion.objects.create(name="abc", reference="abc")
+        ImageReference.acquire(url)
+
+        self.assertEqual(delete_pending_blobs(), (0, 0))
+
+        blob_container_client.return_value.delete_blobs.assert_not_called()
+        self.assertFalse(PendingBlobDeletion.objects.exists())
+
+    @mock.patch("app.models.blob_deletion_executor")
+    @mock.patch("app.models.blob_container_client")
+    def test_reupload_during_pending_deletion_keeps_blob(self, blob_container_client, executor):
+        """
+        Esta función verifica que si la misma imagen se vuelve a subir entre la última baja y el borrado,
+        el blob reutilizado no se borre.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        container_client = blob_container_client.return_value
+        url, _ = self.upload_existing(container_client)
+        delete_image_from_azure(url, [f"{digest}_100.webp"])
+
+        # Se sube la misma imagen antes de que corra el borrado: con borrados
+        # pendientes el blob no se reutiliza, se vuelve a escribir
+        new_url, thumbnails = self.upload_existing(container_client)
+        original = container_client.get_blob_client.return_value.upload_blob.call_args_list[-1]
+        self.assertTrue(original.kwargs["overwrite"])
+
+        self.assertEqual(delete_pending_blobs(), (0, 0))
+
+        container_client.delete_blobs.assert_not_called()
+        self.assertEqual(new_url, url)
+        self.assertFalse(PendingBlobDeletion.objects.exists())
+        self.assertEqual(ImageReference.objects.get(name=digest).count, 1)
+
+    @mock.patch("app.models.blob_container_client")
+    def test_azure_call_runs_outside_transaction(self, blob_container_client):
+        """
+        Esta función verifica que la solicitud batch a Azure no corra dentro de la transacción
+        que bloquea las referencias, y que solo borre los blobs no modificados desde entonces.
+        """
+        PendingBlobDeletion.objects.create(name="abc", reference="abc")
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def delete_blobs(*names, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return [mock.Mock(status_code=202)]
+
+        delete_blobs_mock = blob_container_client.return_value.delete_blobs
+        delete_blobs_mock.side_effect = delete_blobs
+        before = timezone.now()
+
+        self.assertEqual(delete_pending_blobs(), (1, 0))
+
+        self.assertEqual(depths, [depth])
+        self.assertLess(delete_blobs_mock.call_args.kwargs["if_unmodified_since"], before)
+
+    @mock.patch("app.models.blob_deletion_executor")
+    @mock.patch("app.models.blob_container_client")
+    def test_reupload_during_azure_call_keeps_blob(self, blob_container_client, executor):
+        """
+        Esta función verifica que si la imagen se vuelve a subir mientras corre el borrado en Azure,
+        el borrado condicional falle, quede para reintentar y el reintento lo descarte.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        container_client = blob_container_client.return_value
+        url, _ = self.upload_existing(container_client)
+        delete_image_from_azure(url)
+
+        def delete_blobs(*names, **kwargs):
+            # La subida llega con las referencias ya desbloqueadas
+            self.upload_existing(container_client)
+            return [mock.Mock(status_code=412, reason="Condition Not Met")]
+
+        container_client.delete_blobs.side_effect = delete_blobs
+        self.assertEqual(delete_pending_blobs(), (0, 1))
+
+        pending = PendingBlobDeletion.objects.get()
+        self.assertEqual((pending.attempts, pending.last_error), (1, "Condition Not Met"))
+        self.assertTrue(container_client.get_blob_client.return_value.upload_blob.call_args_list[-1].kwargs["overwrite"])
+
+        self.assertEqual(delete_pending_blobs(), (0, 0))
+        self.assertEqual(container_client.delete_blobs.call_count, 1)
+        self.assertFalse(PendingBlobDeletion.objects.exists())
+        self.assertEqual(ImageReference.objects.get(name=digest).count, 1)
+
+    @mock.patch("app.models.blob_deletion_executor")
+    @mock.patch("app.models.blob_container_client")
+    def test_upload_after_deletion_uploads_again(self, blob_container_client, executor):
+        """
+        Esta función verifica que una subida posterior al borrado vuelva a subir la imagen.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        container_client = blob_container_client.return_value
+        url, _ = self.upload_existing(container_client)
+        delete_image_from_azure(url)
+        container_client.delete_blobs.return_value = [mock.Mock(status_code=202)]
+        self.assertEqual(delete_pending_blobs(), (1, 0))
+        self.assertFalse(ImageReference.objects.filter(name=digest).exists())
+
+        blob_client = container_client.get_blob_client.return_value
+        blob_client.exists.return_value = False
+        upload_image_to_azure(SimpleUploadedFile("pipeta.png", image_data, content_type="image/png"))
+
+        self.assertTrue(blob_client.upload_blob.called)
+        self.assertEqual(ImageReference.objects.get(name=digest).count, 1)
+
+    @mock.patch("app.models.blob_container_client")
+    def test_reference_is_taken_before_checking_blob(self, blob_container_client):
+        """
+        Esta función verifica que la subida tome la referencia antes de decidir si reutiliza el blob.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        counts = []
+
+        def exists():
+            counts.append(ImageReference.objects.get(name=digest).count)
+            return True
+
+        blob_container_client.return_value.get_blob_client.return_value.exists.side_effect = exists
+        upload_image_to_azure(SimpleUploadedFile("pipeta.png", image_data, content_type="image/png"))
+
+        self.assertEqual(counts[0], 1)
+
+    @mock.patch("app.models.blob_deletion_executor")
+    @mock.patch("app.models.blob_container_client")
+    def test_failed_save_releases_upload(self, blob_container_client, executor):
+        """
+        Esta función verifica que si el producto no se guarda se suelte la referencia de la imagen subida.
+        """
+        digest = hashlib.sha256(image_data).hexdigest()
+        blob_container_client.return_value.get_blob_client.return_value.exists.return_value = True
+        data = {"name": "Pipeta", "tag": "perro", "price": 10, "description": "lorem", "provider": "1"}
+        upload = SimpleUploadedFile("pipeta.png", image_data, content_type="image/png")
+
+        with mock.patch("app.models.EntityCounter.bump", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            Product.save_product(data, upload)
+
+        self.assertEqual(ImageReference.objects.get(name=digest).count, 0)
+        self.assertTrue(PendingBlobDeletion.objects.filter(name=digest).exists())
+
+    def upload_existing(self, container_client):
+        """
+        Sube image_data con el blob ya existente en el contenedor simulado.
+        """
+        container_client.get_blob_client.return_value.exists.return_value = True
+        return upload_image_to_azure(SimpleUploadedFile("pipeta.png", image_data, content_type="image/png"))
+
+    @mock.patch("app.models.blob_deletion_executor")
+    @mock.patch("app.models.upload_image_to_azure")
+    def test_update_keeps_old_image_until_commit(self, upload_image_to_azure, executor):
+        """
+        Esta función verifica que al reemplazar la imagen la anterior se borre recién después del commit.
+        """
+        old_url = "https://vetsoft.blob.core.windows.net/imagenes/viejo"
+        new_url = "https://vetsoft.blob.core.windows.net/imagenes/nuevo"
+        provider = Provider.objects.create(name="Proveedor A", email="a@vetsoft.com", address="Calle 1")
+        product = Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem", image_url=old_url)
+        ImageReference.acquire(old_url)
+
+        def upload(image):
+            # La subida toma la referencia a la imagen nueva
+            ImageReference.acquire(new_url)
+            return new_url, {}
+
+        upload_image_to_azure.side_effect = upload
+        data = {"name": "Pipeta", "tag": "perro", "price": 10, "description": "lorem", "provider": provider.id}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(product.update_product(data, object()), (True, None))
+
+        product.refresh_from_db()
+        self.assertEqual(product.image_url, new_url)
+        self.assertEqual(dict(ImageReference.objects.values_list("name", "count")), {"nuevo": 1, "viejo": 0})
+        self.assertEqual(executor.submit.call_args.args[1], ["viejo"])
+
+    def test_rebuild_counts_products_and_medicines(self):
+        """
+        Esta función verifica que la reconstrucción cuente las URLs de productos y medicamentos.
+        """
+        url = "https://vetsoft.blob.core.windows.net/imagenes/abc"
+        Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem", image_url=url)
+        Medicine.objects.create(name="Antibiótico", description="lorem", dose=5, image_url=url)
+        PendingBlobDeletion.objects.create(name="viejo", reference="viejo")
+
+        self.assertEqual(ImageReference.rebuild(), 1)
+        self.assertEqual(ImageReference.objects.get(name="abc").count, 2)
+        # La imagen con borrados pendientes conserva su fila para bloquearla al borrar
+        self.assertEqual(ImageReference.objects.get(name="viejo").count, 0)
+
+
+class TagTest(TestCase):
+    """
+    Pruebas para las etiquetas normalizadas de productos.
+    """
+    def test_save_syncs_tags(self):
+        """
+        Esta función verifica que guardar un producto normalice su texto de etiquetas y sincronice la tabla.
+        """
+        product = Product.objects.create(name="Pipeta", tag=" perro, gato,,perro ", price=10, description="lorem")
+        self.assertEqual(product.tag, "perro,gato")
+        self.assertEqual(sorted(product.tags.values_list("name", flat=True)), ["gato", "perro"])
+
+        product.tag = "gato"
+        product.save()
+
+        self.assertEqual(list(product.tags.values_list("name", flat=True)), ["gato"])
+
+    def test_tags_are_synced_before_version_bump(self):
+        """
+        Esta función verifica que las etiquetas ya estén guardadas cuando cambia la versión de la tabla.
+        """
+        product = Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem")
+        seen = []
+
+        def bump(model):
+            if model is Product:
+                seen.append(sorted(Tag.objects.filter(products=product).values_list("name", flat=True)))
+
+        product.tag = "gato"
+        with mock.patch("app.models.bump_table_version", side_effect=bump):
+            product.save()
+
+        self.assertEqual(seen, [["gato"]])
+
+
+class FacetCountTest(TestCase):
+    """
+    Pruebas para los conteos de las facetas de productos.
+    """
+    def setUp(self):
+        """
+        Crea productos de dos proveedores, con distintos precios y etiquetas.
+        """
+        cache.clear()
+        self.provider = Provider.objects.create(name="Proveedor A", email="a@vetsoft.com", address="Calle 1")
+        Product.objects.create(name="Pipeta", tag="perro,gato", price=500, description="lorem", provider=self.provider)
+        Product.objects.create(name="Collar", tag="perro", price=3000, description="lorem", provider=self.provider)
+        Product.objects.create(name="Cucha", tag="perro", price=25000, description="lorem")
+        Tag.objects.create(name="sin uso")
+
+    def test_counts_every_facet_in_one_query(self):
+        """
+        Esta función verifica que los conteos de las tres facetas salgan de una sola consulta.
+        """
+        with self.assertNumQueries(1):
+            rows = list(count_query(Product.objects.all()))
+
+        self.assertCountEqual(rows, [
+            ("provider", str(self.provider.id), "Proveedor A", 2),
+            ("price", "0-1000", "", 1),
+            ("price", "1000-5000", "", 1),
+            ("price", "20000-", "", 1),
+            ("tag", "gato", "gato", 1),
+            ("tag", "perro", "perro", 3),
+        ])
+
+    def test_counts_are_cached_per_table_version(self):
+        """
+        Esta función verifica que los conteos se reutilicen hasta que cambia la tabla de productos.
+        """
+        facet_counts(Product.objects.all(), "", {})
+        with self.assertNumQueries(0):
+            facet_counts(Product.objects.all(), "", {})
+
+        Product.objects.create(name="Correa", tag="gato", price=700, description="lorem")
+
+        rows = facet_counts(Product.objects.all(), "", {})
+        self.assertIn(("tag", "gato", "gato", 2), rows)
+
+
+class ListRowTest(TestCase):
+    """
+    Pruebas para las filas compactas de los listados.
+    """
+    def test_product_row_loads_provider_name_without_model_instances(self):
+        """
+        Esta función verifica que la fila de producto traiga el nombre del proveedor en la misma consulta
+        y las etiquetas de todas las filas en una más.
+        """
+        provider = Provider.objects.create(name="Proveedor Test", email="p@vetsoft.com", address="Calle 1")
+        Product.objects.create(name="Pipeta", tag="perro", price=10, description="lorem", provider=provider)
+
+        with self.assertNumQueries(2):
+            rows = ProductRow.fetch(Product.objects.all())
+
+        self.assertEqual(rows[0].name, "Pipeta")
+        self.assertEqual(rows[0].provider, "Proveedor Test")
+        self.assertEqual(rows[0].tags, ["perro"])
+        self.assertFalse(hasattr(rows[0], "__dict__"))
+
+    def test_pet_row_without_client(self):
+        """
+        Esta función verifica que una mascota sin dueño se cargue con el dueño vacío.
+        """
+        Pet.objects.create(name="Luna", breed="Siames", birthday="2020-01-01", weight=3)
+
+        rows = PetRow.fetch(Pet.objects.all())
+
+        self.assertEqual(rows[0].name, "Luna")
+        self.assertIsNone(rows[0].client)
+
+
+class TableVersionTest(TestCase):
+    """
+    Pruebas para las versiones de tablas de la caché de páginas.
+    """
+    def test_page_cache_eviction_keeps_versions(self):
+        """
+        Esta función verifica que vaciar la caché de páginas no pierda las versiones de las tablas.
+        """
+        bump_table_version(Product)
+        versions = table_versions(Product, Provider)
+
+        cache.clear()
+
+        self.assertEqual(table_versions(Product, Provider), versions)
+
+    def test_page_cache_evicts_least_recently_used(self):
+        """
+        Esta función verifica que al llenarse la caché de páginas se desalojen las entradas menos usadas.
+        """
+        cache.clear()
+        max_entries = cache._max_entries
+        cache.set("vieja", 1)
+        cache.set("usada", 1)
+        for i in range(max_entries - 2):
+            cache.set(f"relleno:{i}", 1)
+        cache.get("usada")
+
+        cache.set("nueva", 1)
+
+        self.assertIsNone(cache.get("vieja"))
+        self.assertEqual(cache.get("usada"), 1)
+        cache.clear()
+
+
+class EntityCounterTest(TestCase):
+    """
+    Pruebas para los contadores del tablero del inicio.
+    """
+    client_data = {
+        "name": "Juan Sebastian Veron",
+        "phone": "54221555232",
+        "email": "brujita75@vetsoft.com",
+        "city": "La Plata",
+    }
+
+    def test_save_update_and_delete_client_keep_counters(self):
+        """
+        Esta función verifica que alta, cambio de ciudad y baja de un cliente actualicen los contadores.
+        """
+        Client.save_client(self.client_data)
+        counters = EntityCounter.snapshot()
+        self.assertEqual(counters["client"], 1)
+        self.assertEqual(counters["client.city:La Plata"], 1)
+
+        client = Client.objects.get()
+        client.update_client({**self.client_data, "city": "Berisso"})
+        counters = EntityCounter.snapshot()
+        self.assertEqual(counters["client.city:La Plata"], 0)
+        self.assertEqual(counters["client.city:Berisso"], 1)
+
+        client.delete()
+        counters = EntityCounter.snapshot()
+        self.assertEqual(counters["client"], 0)
+        self.assertEqual(counters["client.city:Berisso"], 0)
+
+    def test_invalid_client_does_not_change_counters(self):
+        """
+        Esta función verifica que un cliente inválido no sume al contador.
+        """
+        Client.save_client({**self.client_data, "phone": "abc"})
+
+        counters = EntityCounter.snapshot()
+        self.assertEqual(counters.get("client", 0), 0)
+        self.assertNotIn("client.city:La Plata", counters)
+
+    def test_rows_created_outside_save_methods_are_counted(self):
+        """
+        Esta función verifica que objects.create, save y delete mantengan los contadores.
+        """
+        client = Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="Morón")
+        Product(name="Pipeta", tag="perro", price=10, description="lorem").save()
+        self.assertEqual(EntityCounter.read("client"), 1)
+        self.assertEqual(EntityCounter.read("client.city:Morón"), 1)
+        self.assertEqual(EntityCounter.read("product"), 1)
+
+        client.city = "Tigre"
+        client.save()
+        self.assertEqual(EntityCounter.read("client.city:Morón"), 0)
+        self.assertEqual(EntityCounter.read("client.city:Tigre"), 1)
+
+        Client.objects.get().delete()
+        Product.objects.get().delete()
+        self.assertEqual(EntityCounter.read("client"), 0)
+        self.assertEqual(EntityCounter.read("client.city:Tigre"), 0)
+        self.assertEqual(EntityCounter.read("product"), 0)
+
+    def test_rebuild_counts_rows_created_outside_save_methods(self):
+        """
+        Esta función verifica que la reconstrucción recupere los totales reales.
+        """
+        Client.objects.create(name="Ana", phone=54221, email="ana@vetsoft.com", city="Morón")
+        Pet.objects.create(name="Luna", breed="Siames", birthday="2020-01-01", weight=3)
+        # Filas cargadas sin pasar por save (por ejemplo, con bulk_create o SQL)
+        EntityCounter.objects.all().delete()
+        EntityCounter.objects.create(key="client.city:Tigre", value=5)
+
+        EntityCounter.rebuild()
+
+        counters = EntityCounter.snapshot()
+        self.assertEqual(counters["client"], 1)
+        self.assertEqual(counters["pet"], 1)
+        self.assertEqual(counters["product"], 0)
+        self.assertEqual(counters["client.city:Morón"], 1)
+        self.assertNotIn("client.city:Tigre", counters)
+
+
+class TemplateWarmUpTest(TestCase):
+    """
+    Pruebas para el precalentamiento de templates al arrancar.
+    """
+    def test_warm_up_fills_cached_loader(self):
+        """
+        Esta función verifica que todos los templates de la app queden en el loader en caché.
+        """
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+
+        count, _ = warm_up()
+
+        self.assertEqual(count, len(template_names()))
+        self.assertIn("products/form.html", template_names())
+        for name in template_names():
+            self.assertIn(name, loader.get_template_cache)
+
+    @mock.patch("app.warmup.warm_up")
+    def test_server_warm_up_follows_setting(self, warm_up):
+        """
+        Esta función verifica que el arranque del servidor precompile los templates solo con TEMPLATE_WARMUP.
+        """
+        with self.settings(TEMPLATE_WARMUP=False):
+            warm_up_server()
+        warm_up.assert_not_called()
+
+        with self.settings(TEMPLATE_WARMUP=True):
+            warm_up_server()
+        warm_up.assert_called_once_with()
+
+
+class TextSearchTest(TestCase):
+    """
+    Pruebas para la búsqueda de texto de productos y medicamentos.
+    """
+    def setUp(self):
+        """
+        Crea dos medicamentos para buscar.
+        """
+        Medicine.objects.create(name="Amoxicilina", description="Antibiótico de amplio espectro", dose=5)
+        Medicine.objects.create(name="Ivermectina", description="Antiparasitario", dose=2)
+
+    def test_fallback_matches_any_field(self):
+        """
+        Esta función verifica que sin PostgreSQL se busque con icontains y sin ranking.
+        """
+        medicines, ranked = text_search(Medicine.objects.all(), "espectro", ("name", "description"))
+
+        self.assertFalse(ranked)
+        self.assertEqual([m.name for m in medicines], ["Amoxicilina"])
+
+    def test_postgres_path_annotates_rank(self):
+        """
+        Esta función verifica que en PostgreSQL la búsqueda use el vector y anote la relevancia.
+        """
+        with mock.patch("app.search.supports_full_text", return_value=True):
+            medicines, ranked = text_search(Medicine.objects.all(), "antibióticos", ("name", "description"))
+
+        self.assertTrue(ranked)
+        self.assertIn("rank", medicines.query.annotations)
+
+
+class SearchPlannerTest(TestCase):
+    """
+    Pruebas para la clasificación de términos y el armado de la búsqueda.
+    """
+    def test_classifies_terms(self):
+        """
+        Esta función verifica la interpretación de dígitos, decimales, fechas y texto.
+        """
+        self.assertEqual(SearchTerm("5422").digits, "5422")
+        self.assertEqual(SearchTerm("12,5").number_range, (Decimal("12.5"), Decimal("12.6")))
+        self.assertEqual(SearchTerm("2020-02").date_range, (date(2020, 2, 1), date(2020, 3, 1)))
+        self.assertEqual(SearchTerm("31/12/2020").date_range, (date(2020, 12, 31), date(2021, 1, 1)))
+        self.assertIsNone(SearchTerm("30/02/2020").date_range)
+
+        term = SearchTerm("Luna")
+        self.assertIsNone(term.digits)
+        self.assertIsNone(term.number_range)
+        self.assertIsNone(term.date_range)
+
+    def test_normalize_removes_case_and_accents(self):
+        """
+        Esta función verifica la normalización de los términos de búsqueda.
+        """
+        self.assertEqual(normalize("Morón"), "moron")
+        self.assertEqual(normalize("PEÑA Díaz"), "pena diaz")
+
+    def test_phone_prefix_matches_without_casting(self):
+        """
+        Esta función verifica que un prefijo de dígitos encuentre teléfonos por rango.
+        """
+        ana = Client.objects.create(name="Ana", phone=542214567890, email="ana@vetsoft.com", city="La Plata")
+        Client.objects.create(name="Juan", phone=541199990000, email="juan@vetsoft.com", city="Berisso")
+
+        condition = plan_search("54221", text=("name",), prefix=("phone",))
+
+        self.assertEqual(list(Client.objects.filter(condition)), [ana])
+        self.assertNotIn("icontains", str(plan_search("54221", prefix=("phone",))))
+
+
+class SearchDocumentTest(TestCase):
+    """
+    Pruebas para los documentos de la búsqueda global.
+    """
+    def test_rebuild_restores_missing_documents(self):
+        """
+        Esta función verifica que la reconstrucción genere un documento por fila, en lotes.
+        """
+        for i in range(5):
+            Provider.objects.create(name=f"Proveedor {i}", email=f"p{i}@vetsoft.com", address="Calle 1")
+        SearchDocument.objects.all().delete()
+
+        totals = SearchDocument.rebuild(batch_size=2)
+
+        self.assertEqual(totals["provider"], 5)
+        self.assertEqual(SearchDocument.objects.filter(entity="provider").count(), 5)
+        document = SearchDocument.objects.get(title="Proveedor 3")
+        self.assertEqual(document.detail, "p3@vetsoft.com Calle 1")
+
+
+class CountResultsTest(TestCase):
+    """
+    Pruebas para el conteo acotado de resultados.
+    """
+    def setUp(self):
+        """
+        Crea cinco proveedores.
+        """
+        for i in range(5):
+            Provider.objects.create(name=f"Proveedor {i}", email=f"p{i}@vetsoft.com", address="Calle 1")
+
+    def test_exact_below_cap(self):
+        """
+        Esta función verifica el conteo exacto cuando no se supera el tope.
+        """
+        count = count_results(Provider.objects.all(), cap=10)
+        self.assertFalse(count.capped)
+        self.assertEqual(str(count), "5 resultados")
+
+    def test_capped_above_cap(self):
+        """
+        Esta función verifica que por encima del tope se informe "más de N".
+        """
+        count = count_results(Provider.objects.all(), cap=3)
+        self.assertTrue(count.capped)
+        self.assertEqual(str(count), "más de 3 resultados")
+
+
+class ResultIdCacheTest(TestCase):
+    """
+    Pruebas para la caché de ids de resultados de búsqueda.
+    """
+    def test_evicts_least_recently_used(self):
+        """
+        Esta función verifica que al superar el presupuesto se desaloje la entrada menos usada.
+        """
+        ids = (1, 2, 3)
+        results = ResultIdCache(budget=ResultIdCache.entry_size("a", ids) * 2)
+        results.put("a", ids)
+        results.put("b", ids)
+        results.get("a")
+        results.put("c", ids)
+
+        self.assertEqual(results.get("a"), ids)
+        self.assertIsNone(results.get("b"))
+        self.assertEqual(results.get("c"), ids)
+        self.assertLessEqual(results.size, results.budget)
+
+    def test_normalized_query_hits(self):
+        """
+        Esta función verifica que la misma búsqueda con otros espacios, mayúsculas o acentos use la caché.
+        """
+        result_ids.clear()
+        provider = Provider.objects.create(name="Farmacia", email="f@vetsoft.com", address="Calle 1")
+        queryset = Provider.objects.filter(name="Farmacia")
+
+        self.assertEqual(cached_ids(queryset, "farmacia", (Provider,)), (provider.id,))
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_ids(queryset, "  FÁRMACIA ", (Provider,)), (provider.id,))
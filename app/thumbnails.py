@@ -0,0 +1,46 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Miniaturas que se generan de cada imagen: campo del modelo -> lado máximo en píxeles
+THUMBNAIL_SIZES = {"thumbnail_small": 100, "thumbnail_large": 400}
+
+# Calidad de compresión WebP (0-100)
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_name(name, field):
+    """
+    Devuelve el nombre del blob de una miniatura a partir del nombre de la imagen original.
+    """
+    return f"{name}_{THUMBNAIL_SIZES[field]}.webp"
+
+
+def make_thumbnails(data):
+    """
+    Genera las miniaturas WebP de una imagen, sin deformarla.
+
+    Args:
+        data (file): Archivo (o BytesIO) con la imagen original.
+
+    Returns:
+        dict: {campo: bytes de la miniatura}; vacío si no es una imagen válida.
+    """
+    try:
+        with Image.open(data) as image:
+            # En JPEG decodifica directamente a escala reducida, sin cargar la foto entera
+            image.draft("RGB", (max(THUMBNAIL_SIZES.values()),) * 2)
+            image = ImageOps.exif_transpose(image)
+            transparent = image.mode in ("RGBA", "LA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+
+            thumbnails = {}
+            for field, size in THUMBNAIL_SIZES.items():
+                thumbnail = image.copy()
+                thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+                buffer = BytesIO()
+                thumbnail.save(buffer, "WEBP", quality=THUMBNAIL_QUALITY)
+                thumbnails[field] = buffer.getvalue()
+    except (UnidentifiedImageError, OSError):
+        return {}
+    return thumbnails
@@ -4,6 +4,8 @@ from . import views
 
 urlpatterns = [
     path("", view=views.home, name="home"),
+    path("buscar/", view=views.global_search, name="global_search"),
+    path("autocompletar/<str:entity>/", view=views.autocomplete, name="autocomplete"),
     
 
     # Analisis de imagen
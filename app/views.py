@@ -1,10 +1,38 @@
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 
-from .models import CityEnum, Client, Medicine, Pet, Product, Provider, Veterinary
-
-from django.db.models import ProtectedError,Q
-
-from django.http import JsonResponse
+from .models import (
+    CityEnum,
+    Client,
+    EntityCounter,
+    Medicine,
+    Pet,
+    Product,
+    Provider,
+    SearchDocument,
+    Tag,
+    Veterinary,
+)
+from .autocomplete import ENTITIES as AUTOCOMPLETE_ENTITIES
+from .autocomplete import get_index
+from .cache import cache_page_by_version, conditional_by_version
+from .facets import apply_facets
+from .pagination import count_results, paginate, resolve_sort, sort_ordering
+from .rows import (
+    ClientRow,
+    MedicineRow,
+    PetRow,
+    ProductRow,
+    ProviderRow,
+    RankedMedicineRow,
+    RankedProductRow,
+    VeterinaryRow,
+)
+from .search import cached_filter, cached_text_search, contains_text, plan_search, text_search
+from .streaming import stream_repository
+
+from django.db.models import ProtectedError
+
+from django.http import Http404, JsonResponse
 
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -28,11 +56,122 @@ ENDPOINT = config('ENDPOINT')
 computervision_client = ComputerVisionClient(ENDPOINT, CognitiveServicesCredentials(KEY))
 
 
+def render_repository(request, name, queryset, sort_columns, row_class, context=None, ranked=False):
+    """
+    Renderiza un listado paginado por cursor, o completo en partes con ?stream=1.
+
+    Con ?fragment=rows devuelve las filas de la tabla (el contenido del
+    <tbody>) para la búsqueda mientras se escribe, seguidas de la cantidad de
+    resultados y la paginación de esa búsqueda para reemplazar las de la
+    página. La cantidad de resultados se acota a RESULT_COUNT_CAP.
+
+    Args:
+        request (HttpRequest): La solicitud HTTP actual.
+        name (str): Carpeta de templates y nombre de la variable de filas (por ejemplo "clients").
+        queryset (QuerySet): Filas a listar, ya filtradas.
+        sort_columns (tuple): Columnas por las que se puede ordenar.
+        row_class (type): Fila compacta (ListRow) con las columnas que muestra la tabla.
+        context (dict): Contexto adicional para el template.
+        ranked (bool): Si las filas traen `rank` (búsqueda de texto completo); en
+            ese caso se ordenan por relevancia salvo que se pida otra columna.
+
+    Returns:
+        HttpResponse: La página del listado, o sus filas con el total y la paginación.
+    """
+    template_name = f"{name}/repository.html"
+    context = dict(context or {})
+    default_sort = "id"
+    if ranked:
+        sort_columns = (*sort_columns, "rank")
+        default_sort = "-rank"
+
+    if request.GET.get("stream"):
+        _, field, descending = resolve_sort(request, sort_columns, default_sort)
+        queryset = queryset.order_by(*sort_ordering(field, descending))
+        return stream_repository(
+            request, template_name, f"{name}/rows.html", name, queryset, context, row_class=row_class,
+        )
+
+    page = paginate(request, queryset, sort_columns, default_sort, row_class=row_class)
+    if request.GET.get("fragment") == "rows":
+        template_name = "partials/live_rows.html"
+        context["rows_template"] = f"{name}/rows.html"
+
+    # El total sale de la propia página si entra entera, del contador de la
+    # tabla si el listado no está filtrado, o de un conteo acotado. Un contador
+    # con menos filas de las que ya se ven (más una, si hay siguiente) está
+    # desfasado y no se usa
+    total = None
+    if not page.has_next and not page.has_previous:
+        total = len(page.items)
+    elif not queryset.query.has_filters():
+        total = EntityCounter.read(queryset.model._meta.model_name)
+        if total < len(page.items) + page.has_next:
+            total = None
+    context["result_count"] = count_results(queryset, total=total)
+    return render(request, template_name, {**context, name: page.items, "page": page})
+
+
 def home(request):
     """
-    Renderiza la página de inicio.
+    Renderiza la página de inicio con los totales de cada entidad.
+
+    Los totales salen de la tabla de contadores, en una sola consulta.
     """
-    return render(request, "home.html")
+    counters = EntityCounter.snapshot()
+    totals = {
+        key: counters.get(key, 0)
+        for key in ("client", "provider", "product", "pet", "veterinary", "medicine")
+    }
+    cities = [(city, counters.get(EntityCounter.city_key(city), 0)) for city in CityEnum.values]
+    cities = sorted((city for city in cities if city[1] > 0), key=lambda city: -city[1])
+
+    return render(request, "home.html", {"totals": totals, "cities": cities})
+
+
+
+# Cantidad máxima de resultados de la búsqueda global
+GLOBAL_SEARCH_LIMIT = 50
+
+@conditional_by_version(Client, Provider, Product, Pet, Veterinary, Medicine)
+@cache_page_by_version(Client, Provider, Product, Pet, Veterinary, Medicine)
+def global_search(request):
+    """
+    Busca en todas las entidades a la vez, sobre la tabla de documentos de búsqueda.
+
+    En PostgreSQL los resultados se ordenan por relevancia (texto completo) y
+    también se encuentran por subcadena del título (índice de trigramas).
+    """
+    query = request.GET.get("search", "").strip()
+    documents = []
+
+    if query:
+        documents, ranked = text_search(
+            SearchDocument.objects.all(), query, ("title", "detail"), contains_text("title", query),
+        )
+        ordering = ("-rank", "title", "id") if ranked else ("title", "id")
+        documents = documents.only("entity", "object_id", "title", "detail").order_by(*ordering)
+        documents = documents[:GLOBAL_SEARCH_LIMIT]
+
+    return render(request, "search/results.html", {"query": query, "documents": documents})
+
+
+
+def autocomplete(request, entity):
+    """
+    Devuelve en JSON los nombres que empiezan con ?q=, desde el índice en memoria del proceso.
+
+    Args:
+        request (HttpRequest): Solicitud con el parámetro "q".
+        entity (str): "client", "provider", "veterinary" o "medicine".
+
+    Returns:
+        JsonResponse: {"results": [{"id": ..., "name": ...}, ...]}
+    """
+    if entity not in AUTOCOMPLETE_ENTITIES:
+        raise Http404
+    results = get_index(entity).lookup(request.GET.get("q", ""))
+    return JsonResponse({"results": results})
 
 
 # Analisis de imagen
@@ -150,12 +289,15 @@ def process_image(request):
 
 
 # Cliente
+CLIENT_SORT_COLUMNS = ("name", "phone", "city")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Client)
+@cache_page_by_version(Client)
 def clients_repository(request):
     """
     Renderiza la lista de clientes.
     """
-    clients = Client.objects.all()
-    return render(request, "clients/repository.html", {"clients": clients})
+    return render_repository(request, "clients", Client.objects.all(), CLIENT_SORT_COLUMNS, ClientRow)
 
 def clients_form(request, id=None):
     """
@@ -199,31 +341,35 @@ def clients_delete(request):
 
     return redirect(reverse("clients_repo"))
 
+@conditional_by_version(Client)
+@cache_page_by_version(Client)
 def clients_search(request):
     query = request.GET.get('search')
 
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        clients = Client.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(email__icontains=query) |  # Búsqueda por email que contiene la consulta
-            Q(phone__icontains=query) |  # Búsqueda por phone que contiene la consulta
-            Q(city__icontains=query)     # Búsqueda por city que contiene la consulta
+        # Texto en nombre, email y ciudad; si son dígitos, prefijo del teléfono
+        clients = cached_filter(
+            Client.objects.all(),
+            plan_search(query, text=("name", "email", "city"), prefix=("phone",)),
+            query,
+            (Client,),
         )
     else:
         clients = Client.objects.all()
 
-    context = {'clients': clients, 'query': query}
-    return render(request, 'clients/repository.html', context)
+    return render_repository(request, 'clients', clients, CLIENT_SORT_COLUMNS, ClientRow, {'query': query})
 
 
 # Proveedor
+PROVIDER_SORT_COLUMNS = ("name", "address")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Provider)
+@cache_page_by_version(Provider)
 def provider_repository(request):
     """
     Renderiza la lista de proveedores.
     """
-    providers = Provider.objects.all()
-    return render(request, "providers/repository.html", {"providers": providers})
+    return render_repository(request, "providers", Provider.objects.all(), PROVIDER_SORT_COLUMNS, ProviderRow)
 
 
 def provider_form(request, id=None):
@@ -273,29 +419,32 @@ def provider_delete(request):
 
     return redirect(reverse("provider_repo"))
 
+@conditional_by_version(Provider)
+@cache_page_by_version(Provider)
 def provider_search(request):
     query = request.GET.get('search')
 
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        providers = Provider.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(email__icontains=query) |  # Búsqueda por email que contiene la consulta
-            Q(address__icontains=query)  # Búsqueda por address que contiene la consulta
+        # Texto en nombre, email y dirección
+        providers = cached_filter(
+            Provider.objects.all(), plan_search(query, text=("name", "email", "address")), query, (Provider,),
         )
     else:
         providers = Provider.objects.all()
 
-    context = {'providers': providers, 'query': query}
-    return render(request, 'providers/repository.html', context)
+    return render_repository(request, 'providers', providers, PROVIDER_SORT_COLUMNS, ProviderRow, {'query': query})
 
 # Producto
+PRODUCT_SORT_COLUMNS = ("name", "price")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Product, Provider, signed_urls=True)
+@cache_page_by_version(Product, Provider)
 def product_repository(request):
     """
     Renderiza la lista de productos.
     """
-    products = Product.objects.all()
-    return render(request, "products/repository.html", {"products": products})
+    products, context = apply_facets(request, Product.objects.all())
+    return render_repository(request, "products", products, PRODUCT_SORT_COLUMNS, ProductRow, context)
 
 def product_form(request, id=None):
     """
@@ -346,13 +495,22 @@ def product_form(request, id=None):
             return redirect(reverse("product_repo"))
 
         return render(
-            request, "products/form.html", {"errors": errors, "product": request.POST, "providers": providers}
+            request,
+            "products/form.html",
+            {
+                "errors": errors,
+                "product": request.POST,
+                "tags": Tag.parse(request.POST.get("tag")),
+                "providers": providers,
+            },
         )
     product = None
+    tags = []
     if id is not None:
         product = get_object_or_404(Product, pk=id)
+        tags = product.tags.values_list("name", flat=True)
 
-    return render(request, "products/form.html", {"product": product, "providers": providers})
+    return render(request, "products/form.html", {"product": product, "tags": tags, "providers": providers})
 
 def product_delete(request):
     """
@@ -364,32 +522,43 @@ def product_delete(request):
 
     return redirect(reverse("product_repo"))
 
+@conditional_by_version(Product, Provider, signed_urls=True)
+@cache_page_by_version(Product, Provider)
 def product_search(request):
     query = request.GET.get('search')
 
+    ranked = False
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        products = Product.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(description__icontains=query) |  # Búsqueda por descripción que contiene la consulta
-            Q(tag__icontains=query) | # Búsqueda por dosis que contiene la consulta
-            Q(price__icontains=query) | # Búsqueda por precio que contiene la consulta
-            Q(provider__name__icontains=query) # Búsqueda por nombre de proveedor que contiene la consulta          
+        # Texto completo sobre nombre, etiqueta y descripción (ordenado por
+        # relevancia en PostgreSQL), más rango de precio y proveedor con OR
+        products, ranked = cached_text_search(
+            Product.objects.all(),
+            query,
+            ("name", "tag", "description"),
+            plan_search(query, text=("provider__name",), numbers=("price",)),
+            models=(Product, Provider),
         )
     else:
         products = Product.objects.all()
 
-    context = {'products': products, 'query': query}
-    return render(request, 'products/repository.html', context)
+    # Filtros por proveedor, rango de precio y etiqueta, con sus conteos
+    products, context = apply_facets(request, products, query)
+    row_class = RankedProductRow if ranked else ProductRow
+    return render_repository(
+        request, 'products', products, PRODUCT_SORT_COLUMNS, row_class, {**context, 'query': query}, ranked=ranked,
+    )
 
 
 # Mascota
+PET_SORT_COLUMNS = ("name", "breed", "birthday", "weight")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Pet, Client)
+@cache_page_by_version(Pet, Client)
 def pet_repository(request):
     """
     Renderiza la lista de mascotas.
     """
-    pets = Pet.objects.all()
-    return render(request, "pets/repository.html", {"pets": pets})
+    return render_repository(request, "pets", Pet.objects.all(), PET_SORT_COLUMNS, PetRow)
 
 def pet_form(request, id=None):
     """
@@ -448,25 +617,29 @@ def pet_delete(request):
 
     return redirect(reverse("pet_repo"))
 
+@conditional_by_version(Pet, Client)
+@cache_page_by_version(Pet, Client)
 def pet_search(request):
     query = request.GET.get('search')
 
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        pets = Pet.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(breed__icontains=query) |  # Búsqueda por email que contiene la consulta
-            Q(birthday__icontains=query) |  # Búsqueda por phone que contiene la consulta
-            Q(weight__icontains=query) |   # Búsqueda por city que contiene la consulta
-            Q(client__name__icontains=query) 
+        # Texto en nombre, raza y dueño; fechas por rango de nacimiento y
+        # números por rango de peso
+        pets = cached_filter(
+            Pet.objects.all(),
+            plan_search(
+                query, text=("name", "breed", "client__name"), numbers=("weight",), dates=("birthday",),
+            ),
+            query,
+            (Pet, Client),
         )
     else:
         pets = Pet.objects.all()
 
-    context = {'pets': pets, 'query': query}
-    return render(request, 'pets/repository.html', context)
+    return render_repository(request, 'pets', pets, PET_SORT_COLUMNS, PetRow, {'query': query})
 
 # Mascota Historial
+@conditional_by_version(Pet, Medicine, Veterinary)
 def pet_history(request, id):
     pet = get_object_or_404(Pet.objects.prefetch_related("medicines", "veterinaries"), id=id)
 
@@ -527,12 +700,15 @@ def pet_form_history(request, id):
     })
 
 # Veterinario
+VETERINARY_SORT_COLUMNS = ("name", "phone")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Veterinary)
+@cache_page_by_version(Veterinary)
 def veterinary_repository(request):
     """
     Renderiza la lista de veterinarios.
     """
-    veterinaries = Veterinary.objects.all()
-    return render(request, "veterinaries/repository.html", {"veterinaries": veterinaries})
+    return render_repository(request, "veterinaries", Veterinary.objects.all(), VETERINARY_SORT_COLUMNS, VeterinaryRow)
 
 def veterinary_form(request, id=None):
     """
@@ -574,29 +750,34 @@ def veterinary_delete(request):
 
     return redirect(reverse("veterinary_repo"))
 
+@conditional_by_version(Veterinary)
+@cache_page_by_version(Veterinary)
 def veterinary_search(request):
     query = request.GET.get('search')
 
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        veterinaries = Veterinary.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(email__icontains=query) |  # Búsqueda por email que contiene la consulta
-            Q(phone__icontains=query)  # Búsqueda por phone que contiene la consulta
+        # Texto en nombre y email; si son dígitos, prefijo del teléfono
+        veterinaries = cached_filter(
+            Veterinary.objects.all(),
+            plan_search(query, text=("name", "email"), prefix=("phone",)),
+            query,
+            (Veterinary,),
         )
     else:
         veterinaries = Veterinary.objects.all()
 
-    context = {'veterinaries': veterinaries, 'query': query}
-    return render(request, 'veterinaries/repository.html', context)
+    return render_repository(request, 'veterinaries', veterinaries, VETERINARY_SORT_COLUMNS, VeterinaryRow, {'query': query})
 
 # Medicamentos
+MEDICINE_SORT_COLUMNS = ("name", "dose")  # Columnas ordenables, con índice (columna, id)
+
+@conditional_by_version(Medicine, signed_urls=True)
+@cache_page_by_version(Medicine)
 def medicine_repository(request):
     """
     Renderiza la lista de medicamentos.
     """
-    medicines = Medicine.objects.all()
-    return render(request, "medicines/repository.html", {"medicines": medicines})
+    return render_repository(request, "medicines", Medicine.objects.all(), MEDICINE_SORT_COLUMNS, MedicineRow)
 
 def medicine_form(request, id=None):
     """
@@ -639,18 +820,22 @@ def medicine_delete(request):
 
     return redirect(reverse("medicine_repo"))
 
+@conditional_by_version(Medicine, signed_urls=True)
+@cache_page_by_version(Medicine)
 def medicine_search(request):
     query = request.GET.get('search')
 
+    ranked = False
     if query:
-        # Realiza la búsqueda en varios campos utilizando Q objects
-        medicines = Medicine.objects.filter(
-            Q(name__icontains=query) |  # Búsqueda por nombre que contiene la consulta
-            Q(description__icontains=query) |  # Búsqueda por descripción que contiene la consulta
-            Q(dose__icontains=query)  # Búsqueda por dosis que contiene la consulta
+        # Texto completo sobre nombre y descripción (ordenado por relevancia en
+        # PostgreSQL), más la dosis exacta con OR
+        medicines, ranked = cached_text_search(
+            Medicine.objects.all(), query, ("name", "description"), plan_search(query, numbers=("dose",)),
         )
     else:
         medicines = Medicine.objects.all()
 
-    context = {'medicines': medicines, 'query': query}
-    return render(request, 'medicines/repository.html', context)
+    row_class = RankedMedicineRow if ranked else MedicineRow
+    return render_repository(
+        request, 'medicines', medicines, MEDICINE_SORT_COLUMNS, row_class, {'query': query}, ranked=ranked,
+    )
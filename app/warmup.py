@@ -0,0 +1,55 @@
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+# Carpeta con los templates de la aplicación
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+
+def template_names():
+    """
+    Devuelve los nombres de todos los templates de la aplicación, ordenados.
+    """
+    return sorted(path.relative_to(TEMPLATES_DIR).as_posix() for path in TEMPLATES_DIR.rglob("*.html"))
+
+
+def warm_up():
+    """
+    Compila los templates de la aplicación y resuelve las URLs del menú.
+
+    Con el loader en caché (el que Django usa cuando no se configuran loaders)
+    cada template se parsea una sola vez por proceso; hacerlo al arrancar evita
+    que las primeras solicitudes después de un deploy paguen ese costo. Importar
+    los context processors resuelve los reverse() de los enlaces del menú.
+
+    Returns:
+        tuple: (cantidad de templates compilados, segundos empleados).
+    """
+    start = time.perf_counter()
+
+    from . import context_processors  # noqa: F401
+
+    names = template_names()
+    for name in names:
+        get_template(name)
+
+    elapsed = time.perf_counter() - start
+    logger.info("Templates precompilados: %d en %.3f s", len(names), elapsed)
+    return len(names), elapsed
+
+
+def warm_up_server():
+    """
+    Precompila los templates si TEMPLATE_WARMUP está activo.
+
+    Se llama desde los puntos de entrada WSGI y ASGI (vetsoft/wsgi.py,
+    vetsoft/asgi.py), es decir solo en los procesos que atienden solicitudes
+    (runserver incluido), no en migrate, test, shell ni los demás comandos.
+    """
+    if settings.TEMPLATE_WARMUP:
+        warm_up()
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 
 import os
+import tempfile
 
 from decouple import config
 
@@ -82,6 +83,9 @@ TEMPLATES = [
     },
 ]
 
+# Precompila los templates de la app al arrancar el servidor WSGI/ASGI (ver app/warmup.py)
+TEMPLATE_WARMUP = config("TEMPLATE_WARMUP", default=True, cast=bool)
+
 WSGI_APPLICATION = "vetsoft.wsgi.application"
 
 
@@ -101,10 +105,65 @@ DATABASES = {
     }
 }
 
+# Caché de páginas y conteos de facetas (app/cache.py, app/facets.py). En
+# memoria de cada proceso, con desalojo LRU: al superar MAX_ENTRIES se descarta
+# la décima parte de las entradas usadas hace más tiempo. Sus claves llevan las
+# versiones de las tablas, así que una caché por proceso nunca queda vieja.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "vetsoft-pages",
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=5000, cast=int),
+            "CULL_FREQUENCY": 10,
+        },
+    },
+    # Versiones de las tablas (una clave por modelo, sin vencimiento). Van
+    # aparte para que el desalojo de páginas no las borre, y en archivos para
+    # que las compartan todos los procesos del servidor.
+    "table_versions": {
+        "BACKEND": config("VERSION_CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config(
+            "VERSION_CACHE_LOCATION", default=os.path.join(tempfile.gettempdir(), "vetsoft-versions"),
+        ),
+        "TIMEOUT": None,
+    },
+    # Fragmentos de filas de los listados ({% cache %}). Sus claves llevan la
+    # versión de la fila, así que una caché por proceso nunca queda vieja.
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "vetsoft-fragments",
+        "OPTIONS": {
+            "MAX_ENTRIES": config("FRAGMENT_CACHE_MAX_ENTRIES", default=10000, cast=int),
+        },
+    },
+}
+
+# Memoria máxima (en bytes, por proceso) de la caché de ids de resultados de
+# búsqueda (app/search.py); al superarla se desalojan las búsquedas menos usadas
+SEARCH_RESULT_CACHE_BYTES = config("SEARCH_RESULT_CACHE_BYTES", default=8 * 1024 * 1024, cast=int)
+
 # Conexion con blob storage
 AZURE_BLOB_CONNECTION_STRING = config('AZURE_BLOB_CONNECTION_STRING')
 AZURE_BLOB_CONTAINER_NAME = config('AZURE_BLOB_CONTAINER_NAME')
 
+# Las imágenes se muestran con un token SAS de lectura de cada blob. Con
+# AZURE_BLOB_CONTAINER_SAS=True se usa en cambio un único token de todo el
+# contenedor: se firma menos, pero una URL filtrada da acceso de lectura a todas
+# las imágenes durante hasta 1,5 h.
+AZURE_BLOB_CONTAINER_SAS = config("AZURE_BLOB_CONTAINER_SAS", default=False, cast=bool)
+
+# Subida de imágenes: los archivos de más de AZURE_BLOB_SINGLE_PUT_SIZE se suben
+# en bloques de AZURE_BLOB_BLOCK_SIZE, hasta AZURE_BLOB_MAX_CONCURRENCY a la vez
+AZURE_BLOB_BLOCK_SIZE = config("AZURE_BLOB_BLOCK_SIZE", default=4 * 1024 * 1024, cast=int)
+AZURE_BLOB_SINGLE_PUT_SIZE = config("AZURE_BLOB_SINGLE_PUT_SIZE", default=8 * 1024 * 1024, cast=int)
+AZURE_BLOB_MAX_CONCURRENCY = config("AZURE_BLOB_MAX_CONCURRENCY", default=4, cast=int)
+
+# Los archivos subidos de más de este tamaño se guardan en un archivo temporal
+# en lugar de en memoria mientras se procesan
+FILE_UPLOAD_MAX_MEMORY_SIZE = config("FILE_UPLOAD_MAX_MEMORY_SIZE", default=2_621_440, cast=int)
+
 
 
 # Password validation
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vetsoft.settings")
 
 application = get_wsgi_application()
+
+# Con las apps ya cargadas: precompila los templates antes de la primera solicitud
+from app.warmup import warm_up_server  # noqa: E402
+
+warm_up_server()